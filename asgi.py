@@ -0,0 +1,536 @@
+"""Asyncio serving mode: python-socketio's ASGI server on uvicorn.
+
+An alternative to main.py's Flask-SocketIO/eventlet stack, with the same
+pages, REST routes and socket events and no monkey patching. Game state
+and socket handlers are shared through game.py; the routes use the async
+OpenAI and HTTP clients (content.*_async) and snapshot and event-log writes
+run on worker threads.
+
+Run with `uvicorn asgi:app --host 0.0.0.0 --port 5000` or `python asgi.py`.
+Like the gunicorn setup, use a single worker: games live in process memory.
+"""
+import asyncio
+import contextlib
+import logging
+import mimetypes
+import os
+
+import socketio
+from dotenv import load_dotenv
+from starlette.applications import Starlette
+from starlette.middleware import Middleware
+from starlette.middleware.cors import CORSMiddleware
+from starlette.responses import FileResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from starlette.routing import Mount, Route
+from starlette.staticfiles import StaticFiles
+from starlette.templating import Jinja2Templates
+
+# Local modules read their settings from the environment at import
+load_dotenv()
+
+import assets
+import content
+import game
+import metrics
+import profiling
+from content import extract_video_id
+from eventlog import EXPORT_FORMATS
+from game import active_games, event_log, snapshot_store
+from providers import close_async_clients, warm_up
+from qrcodes import qr_code_data_uri
+
+logging.basicConfig(level=logging.DEBUG)
+
+TEMPLATE_DIR = os.path.join(assets.ROOT_DIR, 'templates')
+
+# Most answer-grading completions in flight at once, across all requests
+CHECK_ANSWER_CONCURRENCY = int(os.environ.get("CHECK_ANSWER_CONCURRENCY", 8))
+check_answer_slots = asyncio.Semaphore(CHECK_ANSWER_CONCURRENCY)
+
+sio = socketio.AsyncServer(
+    async_mode='asgi',
+    cors_allowed_origins='*',
+    logger=True,
+    engineio_logger=True,
+    ping_timeout=60,
+    ping_interval=25,
+)
+
+
+class AsyncioTransport:
+    """game.py's view of the AsyncServer.
+
+    Handlers are synchronous, so emits are queued and sent in order by run();
+    room membership changes apply immediately so room_size() stays exact.
+    """
+
+    def __init__(self, server):
+        self.server = server
+        self._outbox = asyncio.Queue()
+
+    async def run(self):
+        while True:
+            event, payload, room = await self._outbox.get()
+            try:
+                await self.server.emit(event, payload, room=room)
+            except Exception as e:
+                logging.error(f"Error emitting {event} to {room}: {str(e)}")
+
+    def emit(self, event, payload, room):
+        self._outbox.put_nowait((event, payload, room))
+
+    def enter_room(self, sid, room):
+        self.server.manager.basic_enter_room(sid, '/', room)
+
+    def room_size(self, room):
+        try:
+            return sum(1 for _ in self.server.manager.get_participants('/', room))
+        except KeyError:
+            return 0
+
+    def call_later(self, delay, callback):
+        return asyncio.get_running_loop().call_later(delay, callback)
+
+
+transport = AsyncioTransport(sio)
+
+
+@sio.event
+async def connect(sid, environ, auth=None):
+    game.handle_connect(sid)
+
+
+@sio.event
+async def disconnect(sid, *args):
+    game.handle_disconnect(sid)
+
+
+def _bind_socket_handler(event, handler):
+    async def on_event(sid, data):
+        profiling.call_profiler.call(event, handler, sid, data)
+    return on_event
+
+
+for _event, _handler in game.SOCKET_HANDLERS.items():
+    sio.on(_event, _bind_socket_handler(_event, _handler))
+
+
+class RequestProfileMiddleware:
+    """cProfile armed REST paths; see profiling.CallProfiler."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        profile = profiling.call_profiler.start(scope['path']) if scope['type'] == 'http' else None
+        if profile is None:
+            await self.app(scope, receive, send)
+            return
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            profiling.call_profiler.finish(scope['path'], profile)
+
+
+def error_response(error, status_code):
+    return JSONResponse({"success": False, "error": error}, status_code=status_code)
+
+
+async def index(request):
+    return templates.TemplateResponse(request, "index.html")
+
+
+async def host(request):
+    return templates.TemplateResponse(request, "host.html")
+
+
+async def join(request):
+    return templates.TemplateResponse(request, "join.html")
+
+
+async def generate_qr(request):
+    try:
+        data = (await request.json()).get("data", "")
+        if not data:
+            return error_response("No data provided for QR code", 400)
+
+        logging.info(f"Generating QR code for: {data}")
+
+        # PIL rendering is CPU-bound; keep it off the event loop
+        qr_code = await asyncio.to_thread(qr_code_data_uri, data)
+        return JSONResponse({"success": True, "qr_code": qr_code})
+    except Exception as e:
+        logging.error(f"Error generating QR code: {str(e)}")
+        return error_response(str(e), 500)
+
+
+async def get_metrics(request):
+    return JSONResponse(metrics.snapshot())
+
+
+# Game usage, the event export and the profiling routes need the admin token
+def admin_error_response(request):
+    error = profiling.admin_error(request.headers.get(profiling.ADMIN_TOKEN_HEADER))
+    if error is None:
+        return None
+    message, status = error
+    return error_response(message, status)
+
+
+async def get_top_game_usage(request):
+    """Token usage and estimated OpenAI cost of the most expensive games."""
+    denied = admin_error_response(request)
+    if denied:
+        return denied
+    return JSONResponse({"success": True, "top_games": metrics.top_game_usage()})
+
+
+async def get_game_usage(request):
+    denied = admin_error_response(request)
+    if denied:
+        return denied
+    game_code = request.path_params['game_code']
+    return JSONResponse({"success": True, "game_code": game_code, "usage": metrics.game_usage(game_code)})
+
+
+async def export_game_events(request):
+    denied = admin_error_response(request)
+    if denied:
+        return denied
+    game_code = request.path_params['game_code']
+    fmt = request.query_params.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return error_response(f"Unsupported format: {fmt}", 400)
+
+    # Make sure events still sitting in the buffer are part of the export
+    await flush_event_log()
+    if not event_log.segments(game_code):
+        return error_response("No events recorded for this game", 404)
+
+    # Starlette iterates the (blocking) export generator in its thread pool
+    return StreamingResponse(
+        event_log.export(game_code, fmt),
+        media_type="application/gzip",
+        headers={"Content-Disposition": f"attachment; filename={game_code}-events.{fmt}.gz"}
+    )
+
+
+# Admin-only profiling surface; see profiling.py
+async def _json_or_empty(request):
+    try:
+        return await request.json() or {}
+    except ValueError:
+        return {}
+
+
+async def profile_sample(request):
+    """Sample every thread for a few seconds and return collapsed stacks for a flame graph."""
+    denied = admin_error_response(request)
+    if denied:
+        return denied
+    try:
+        data = await _json_or_empty(request)
+        seconds = profiling.clamp_seconds(data.get("seconds", 10))
+        interval_ms = float(data.get("interval_ms", profiling.SAMPLE_INTERVAL_MS))
+    except (TypeError, ValueError) as e:
+        return error_response(str(e), 400)
+
+    sampler = profiling.SamplingProfiler(interval_ms / 1000).start()
+    await asyncio.sleep(seconds)
+    collapsed = sampler.stop()
+    return PlainTextResponse(collapsed, headers={"X-Samples": str(sampler.samples)})
+
+
+async def profile_calls(request):
+    """Arm (POST), read (GET) or drop (DELETE) cProfile for a REST path or socket event."""
+    denied = admin_error_response(request)
+    if denied:
+        return denied
+
+    if request.method == "POST":
+        data = await _json_or_empty(request)
+        target = data.get("target")
+        if not target:
+            return error_response("No target provided", 400)
+        try:
+            count = int(data.get("count", 1))
+        except (TypeError, ValueError) as e:
+            return error_response(str(e), 400)
+        profiling.call_profiler.arm(target, count)
+        return JSONResponse({"success": True, **profiling.call_profiler.status(target)})
+
+    target = request.query_params.get("target", "")
+    if request.method == "DELETE":
+        return JSONResponse({"success": profiling.call_profiler.disarm(target)})
+
+    fmt = request.query_params.get("format", "text")
+    report = profiling.call_profiler.report(target, fmt)
+    if report is None:
+        return JSONResponse({"success": False, "error": f"No profiled calls for {target}",
+                             "status": profiling.call_profiler.status(target)}, status_code=404)
+    if fmt == "prof":
+        return Response(report, media_type="application/octet-stream",
+                        headers={"Content-Disposition": "attachment; filename=calls.prof"})
+    return PlainTextResponse(report)
+
+
+async def get_stalls(request):
+    """Recent event-loop stalls and the stack each was caught in."""
+    denied = admin_error_response(request)
+    if denied:
+        return denied
+    return JSONResponse({"success": True, **profiling.stall_detector.snapshot()})
+
+
+async def create_game(request):
+    try:
+        data = await request.json()
+        url = data["url"]
+        question_interval = data.get("question_interval", 2)  # Default: 2 minutes
+        question_type = data.get("question_type", 3)  # Default: 3 (balanced)
+        grade_level = data.get("grade_level", "6")  # Default: 6th grade
+
+        video_id = extract_video_id(url)
+
+        if not video_id:
+            return error_response("Invalid YouTube URL", 400)
+
+        logging.info(f"Creating game for video ID: {video_id}")
+
+        test_transcript = await content.get_transcript_segment_async(video_id, 10, 70)
+        if test_transcript is None:
+            return error_response(
+                "Could not access video subtitles. The video might not have subtitles enabled, or they might be restricted. Try another video or ensure the video has captions available.",
+                400
+            )
+
+        game_code = game.create_game(video_id, question_interval, question_type, grade_level)
+
+        logging.info(f"Successfully created game with code: {game_code}")
+        return JSONResponse({"success": True, "game_code": game_code, "video_id": video_id})
+    except Exception as e:
+        logging.error(f"Error creating game: {str(e)}")
+        return error_response(f"Could not create game. Error: {str(e)}", 400)
+
+
+async def join_game(request):
+    try:
+        data = await request.json()
+        game_code = data["game_code"]
+        nickname = data["nickname"]
+
+        if game_code not in active_games:
+            logging.warning(f"Attempt to join non-existent game: {game_code}")
+            return error_response("Invalid game code", 400)
+
+        player_id = game.add_player(game_code, nickname)
+        return JSONResponse({"success": True, "player_id": player_id, "game_code": game_code})
+    except Exception as e:
+        logging.error(f"Error joining game: {str(e)}")
+        return error_response(f"Could not join game: {str(e)}", 500)
+
+
+async def generate_question(request):
+    try:
+        data = await request.json()
+        video_id = data["video_id"]
+        start_time = data.get("start_time", 0)
+        end_time = data.get("end_time", start_time + 60)
+        question_type = data.get("question_type", 3)  # Default: 3 (balanced)
+        grade_level = data.get("difficulty", "6")
+        game_code = data.get("game_code")
+
+        question = await content.generate_question_async(video_id, start_time, end_time, question_type,
+                                                         grade_level, game_code=game_code)
+        if not question:
+            return error_response("Could not get video transcript", 400)
+
+        return JSONResponse({"success": True, **question})
+    except Exception as e:
+        logging.error(f"Error generating question: {str(e)}")
+        return error_response(str(e), 500)
+
+
+async def check_answer(request):
+    try:
+        data = await request.json()
+        content_segment = data.get("content_segment")
+        question = data.get("question")
+        answers = data.get("answers", [])
+        game_code = data.get("game_code")
+        video_id = active_games.get(game_code, {}).get('video_id')
+
+        async def check(answer_data):
+            async with check_answer_slots:
+                return await content.check_answer_async(content_segment, question, answer_data,
+                                                        game_code=game_code, video_id=video_id)
+
+        # One completion per answer, at most CHECK_ANSWER_CONCURRENCY in flight
+        results = await asyncio.gather(*(check(answer_data) for answer_data in answers))
+
+        return JSONResponse({"success": True, "results": list(results)})
+    except Exception as e:
+        logging.error(f"Error checking answers: {str(e)}")
+        return error_response(str(e), 500)
+
+
+async def translate_text(request):
+    try:
+        data = await request.json()
+        text = data.get("text")
+        target_language = data.get("target_language", "hebrew")
+        game_code = data.get("game_code")
+
+        if not text:
+            return error_response("No text provided", 400)
+
+        logging.info(f"Translation request received for text: {text[:50]}... to {target_language}")
+
+        translated_text = await content.translate_async(text, target_language, game_code=game_code,
+                                                        video_id=active_games.get(game_code, {}).get('video_id'))
+        logging.info(f"Translation successful. Result: {translated_text[:50]}...")
+
+        return JSONResponse({"success": True, "original": text, "translated": translated_text})
+    except Exception as e:
+        logging.error(f"Error translating text: {str(e)}")
+        return error_response(str(e), 500)
+
+
+async def save_snapshot():
+    """Encode and write changed games to the snapshot file on a worker thread."""
+    try:
+        batch = snapshot_store.collect(active_games)
+        if batch is not None:
+            await asyncio.to_thread(snapshot_store.save, batch)
+    except Exception as e:
+        logging.error(f"Error writing game snapshot: {str(e)}")
+
+
+async def flush_event_log():
+    """Append buffered game events to their segment files on a worker thread."""
+    try:
+        batch = event_log.take_pending()
+        if batch:
+            await asyncio.to_thread(event_log.write, batch)
+    except Exception as e:
+        logging.error(f"Error writing game event log: {str(e)}")
+
+
+async def snapshot_loop():
+    while True:
+        await asyncio.sleep(game.SNAPSHOT_INTERVAL)
+        await save_snapshot()
+
+
+async def event_log_loop():
+    while True:
+        await asyncio.sleep(game.EVENT_LOG_FLUSH_INTERVAL)
+        await flush_event_log()
+
+
+async def stall_heartbeat_loop():
+    while True:
+        profiling.stall_detector.beat()
+        await asyncio.sleep(profiling.stall_detector.interval)
+
+
+async def cleanup_loop():
+    while True:
+        game.cleanup_inactive_games()
+        await asyncio.sleep(3600)
+
+
+@contextlib.asynccontextmanager
+async def lifespan(app):
+    """Restore snapshots and run the background services for the life of the server."""
+    game.set_transport(transport)
+    game.restore_games()
+    tasks = [
+        asyncio.create_task(transport.run()),
+        asyncio.create_task(snapshot_loop()),
+        asyncio.create_task(event_log_loop()),
+        asyncio.create_task(cleanup_loop()),
+        asyncio.create_task(asyncio.to_thread(warm_up)),
+    ]
+    if profiling.stall_detector.enabled:
+        tasks.append(asyncio.create_task(stall_heartbeat_loop()))
+        profiling.stall_detector.start_watchdog()
+    try:
+        yield
+    finally:
+        for task in tasks:
+            task.cancel()
+        # Flush a final snapshot so the next process can resume live games
+        await save_snapshot()
+        await flush_event_log()
+        await close_async_clients()
+
+
+templates = Jinja2Templates(directory=TEMPLATE_DIR)
+
+
+def create_app(static_dir=assets.STATIC_DIR, build_dir=assets.ASSET_BUILD_DIR):
+    """Build the Starlette app and wrap it with the Socket.IO ASGI app."""
+    manifest = assets.build_assets(static_dir, build_dir)
+    served = set(manifest.values())
+
+    def asset_url(filename):
+        if filename in manifest:
+            return f"/assets/{manifest[filename]}"
+        return f"/static/{filename}"
+
+    templates.env.globals['asset_url'] = asset_url
+
+    async def fingerprinted_asset(request):
+        filename = request.path_params['filename']
+        if filename not in served:
+            return PlainTextResponse("Not Found", status_code=404)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        variant, encoding = assets.select_variant(build_dir, filename, request.headers.get('accept-encoding', ''))
+        headers = {'Cache-Control': assets.IMMUTABLE_CACHE_CONTROL, 'Vary': 'Accept-Encoding'}
+        if encoding:
+            headers['Content-Encoding'] = encoding
+        return FileResponse(os.path.join(build_dir, variant), media_type=mimetype, headers=headers)
+
+    routes = [
+        Route("/", index),
+        Route("/host", host),
+        Route("/join", join),
+        Route("/api/generate_qr", generate_qr, methods=["POST"]),
+        Route("/api/metrics", get_metrics),
+        Route("/admin/usage", get_top_game_usage),
+        Route("/api/games/{game_code}/usage", get_game_usage),
+        Route("/api/games/{game_code}/export", export_game_events),
+        Route("/api/create_game", create_game, methods=["POST"]),
+        Route("/api/join_game", join_game, methods=["POST"]),
+        Route("/api/generate_question", generate_question, methods=["POST"]),
+        Route("/api/check_answer", check_answer, methods=["POST"]),
+        Route("/api/translate", translate_text, methods=["POST"]),
+        Route("/admin/profile/sample", profile_sample, methods=["POST"]),
+        Route("/admin/profile/calls", profile_calls, methods=["GET", "POST", "DELETE"]),
+        Route("/admin/stalls", get_stalls),
+        Route("/assets/{filename:path}", fingerprinted_asset),
+        Mount("/static", StaticFiles(directory=static_dir), name="static"),
+    ]
+    starlette_app = Starlette(
+        routes=routes,
+        middleware=[
+            Middleware(CORSMiddleware, allow_origins=["*"], allow_methods=["*"], allow_headers=["*"]),
+            Middleware(RequestProfileMiddleware),
+        ],
+        lifespan=lifespan,
+    )
+    # Socket.IO traffic under /socket.io/ goes to sio; everything else, lifespan included, to Starlette
+    return socketio.ASGIApp(sio, other_asgi_app=starlette_app)
+
+
+app = create_app()
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    logging.info("Starting asyncio server with WebSocket support...")
+    port = int(os.getenv("PORT", 5000))
+    uvicorn.run(app, host='0.0.0.0', port=port, log_level='info')
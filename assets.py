@@ -0,0 +1,143 @@
+"""Content-hashed, precompressed static assets.
+
+build_assets() copies every file under static/ to ASSET_BUILD_DIR under a
+name that embeds a hash of its content, next to .gz and .br variants. The
+Flask app serves those from /assets/ with an immutable Cache-Control header,
+and templates link to them through the asset_url() template global. asgi.py
+serves the same build through select_variant(), without Flask.
+
+Run `python assets.py` to build ahead of time; create_app() also builds on
+startup, reusing files that already exist for the same content hash.
+"""
+import gzip
+import hashlib
+import json
+import logging
+import mimetypes
+import os
+
+try:
+    import brotli
+except ImportError:  # gzip-only until the brotli package is installed
+    brotli = None
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+STATIC_DIR = os.path.join(ROOT_DIR, 'static')
+ASSET_BUILD_DIR = os.environ.get("ASSET_BUILD_DIR", os.path.join(ROOT_DIR, 'build', 'assets'))
+MANIFEST_NAME = 'manifest.json'
+
+HASH_LENGTH = 12
+IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable'
+
+# Content-Encoding -> file suffix, in order of preference
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+
+def hashed_name(logical_name, content):
+    """css/modern.css -> css/modern.<hash>.css"""
+    digest = hashlib.sha256(content).hexdigest()[:HASH_LENGTH]
+    base, ext = os.path.splitext(logical_name)
+    return f"{base}.{digest}{ext}"
+
+
+def _write_if_missing(path, data):
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def build_assets(static_dir=STATIC_DIR, build_dir=ASSET_BUILD_DIR):
+    """Fingerprint and precompress every static file. Returns {logical: hashed} names."""
+    manifest = {}
+    for dirpath, _, filenames in os.walk(static_dir):
+        for filename in sorted(filenames):
+            source = os.path.join(dirpath, filename)
+            logical_name = os.path.relpath(source, static_dir).replace(os.sep, '/')
+            with open(source, 'rb') as f:
+                content = f.read()
+
+            target_name = hashed_name(logical_name, content)
+            target = os.path.join(build_dir, target_name)
+            _write_if_missing(target, content)
+            _write_if_missing(f"{target}.gz", gzip.compress(content, compresslevel=9, mtime=0))
+            if brotli is not None:
+                _write_if_missing(f"{target}.br", brotli.compress(content, quality=11))
+
+            manifest[logical_name] = target_name
+
+    os.makedirs(build_dir, exist_ok=True)
+    with open(os.path.join(build_dir, MANIFEST_NAME), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+    if brotli is None:
+        logging.warning("brotli package not installed; serving gzip-only precompressed assets")
+    logging.info(f"Built {len(manifest)} fingerprinted assets in {build_dir}")
+    return manifest
+
+
+def _accepted_encodings(accept_encoding):
+    accepted = set()
+    for part in accept_encoding.split(','):
+        token, _, params = part.partition(';')
+        quality = params.strip()
+        if quality.startswith('q='):
+            try:
+                if float(quality[2:]) <= 0:
+                    continue
+            except ValueError:
+                continue
+        accepted.add(token.strip().lower())
+    return accepted
+
+
+def select_variant(build_dir, filename, accept_encoding):
+    """Pick the best precompressed file for an Accept-Encoding header.
+
+    Returns (file name in build_dir, Content-Encoding or None).
+    """
+    accepted = _accepted_encodings(accept_encoding)
+    for encoding, suffix in ENCODINGS:
+        if encoding in accepted and os.path.exists(os.path.join(build_dir, filename + suffix)):
+            return filename + suffix, encoding
+    return filename, None
+
+
+def init_app(app, static_dir=STATIC_DIR, build_dir=ASSET_BUILD_DIR):
+    """Build assets and register the /assets/ route and asset_url() template global."""
+    from flask import abort, request, send_from_directory, url_for
+
+    manifest = build_assets(static_dir, build_dir)
+    served = set(manifest.values())
+
+    @app.template_global()
+    def asset_url(filename):
+        if filename in manifest:
+            return f"/assets/{manifest[filename]}"
+        return url_for('static', filename=filename)
+
+    @app.route('/assets/<path:filename>')
+    def fingerprinted_asset(filename):
+        if filename not in served:
+            abort(404)
+
+        mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+        variant, encoding = select_variant(build_dir, filename, request.headers.get('Accept-Encoding', ''))
+        response = send_from_directory(build_dir, variant, mimetype=mimetype)
+        if encoding:
+            response.headers['Content-Encoding'] = encoding
+
+        response.headers['Cache-Control'] = IMMUTABLE_CACHE_CONTROL
+        response.headers['Vary'] = 'Accept-Encoding'
+        return response
+
+    return manifest
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    for logical_name, target_name in sorted(build_assets().items()):
+        print(f"{logical_name} -> {target_name}")
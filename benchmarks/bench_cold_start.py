@@ -0,0 +1,75 @@
+"""Benchmark cold start: module import time and time to first served request.
+
+Each run uses a fresh interpreter so nothing is cached between samples.
+
+Usage: python benchmarks/bench_cold_start.py [--runs 5] [--port 5055]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; start = time.perf_counter(); import main; "
+    "imported = time.perf_counter(); main.create_app(); "
+    "print(imported - start, time.perf_counter() - imported)"
+)
+
+
+def measure_import():
+    output = subprocess.check_output([sys.executable, '-c', IMPORT_SNIPPET], cwd=ROOT,
+                                     stderr=subprocess.DEVNULL, text=True)
+    import_s, factory_s = (float(value) for value in output.split()[-2:])
+    return import_s * 1000, factory_s * 1000
+
+
+def measure_first_request(port, timeout=60.0):
+    env = dict(os.environ, PORT=str(port))
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, 'main.py'], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        while time.perf_counter() - start < timeout:
+            try:
+                with urllib.request.urlopen(f'http://127.0.0.1:{port}/join', timeout=1) as response:
+                    if response.status == 200:
+                        return (time.perf_counter() - start) * 1000
+            except (urllib.error.URLError, ConnectionError, OSError):
+                time.sleep(0.02)
+        raise RuntimeError(f'Server did not answer within {timeout:.0f}s')
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def summarize(label, samples):
+    print(f"{label:<22} median {statistics.median(samples):8.1f} ms   "
+          f"min {min(samples):8.1f} ms   max {max(samples):8.1f} ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--port', type=int, default=5055)
+    args = parser.parse_args()
+
+    imports, factories, first_requests = [], [], []
+    for _ in range(args.runs):
+        import_ms, factory_ms = measure_import()
+        imports.append(import_ms)
+        factories.append(factory_ms)
+        first_requests.append(measure_first_request(args.port))
+
+    summarize('import main', imports)
+    summarize('create_app()', factories)
+    summarize('first served request', first_requests)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Benchmark the game event log: per-call append cost, batch write and export throughput.
+
+append() is what handle_submit_answer pays inline; write() and export()
+run off the event loop or in the export request.
+
+Usage: python benchmarks/bench_event_log.py [--events 100000] [--games 100]
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from eventlog import EventLog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--events', type=int, default=100000)
+    parser.add_argument('--games', type=int, default=100)
+    args = parser.parse_args()
+
+    game_codes = [f'G{i:05d}' for i in range(args.games)]
+    with tempfile.TemporaryDirectory() as tmp:
+        log = EventLog(tmp)
+
+        start = time.perf_counter()
+        for i in range(args.events):
+            log.append(game_codes[i % args.games], 'answer_submitted', question_index=i // 1000,
+                       player_id=str(i % 30), nickname=f'student{i % 30}', answer='Chlorophyll',
+                       elapsed_ms=i % 60000)
+        append_us = (time.perf_counter() - start) / args.events * 1e6
+
+        start = time.perf_counter()
+        log.flush()
+        write_s = time.perf_counter() - start
+
+        start = time.perf_counter()
+        exported = sum(len(chunk) for chunk in log.export(game_codes[0], 'csv'))
+        export_s = time.perf_counter() - start
+
+        print(f"append        {append_us:8.2f} us/event (inline in the socket handler)")
+        print(f"batch write   {args.events / write_s:8.0f} events/s off-loop")
+        print(f"csv export    {args.events // args.games / export_s:8.0f} events/s "
+              f"({exported / 1024:.1f} KiB gzip for one game)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark Socket.IO bytes sent per question round, before and after per-audience views.
+
+"Before" replays the old broadcast scheme, where every socket in the room
+(host + students) got each event in full. "After" uses views.py with the
+same recipients as game.py, including the leaderboard_update and per-player
+rank_update sent once a round is graded.
+
+Usage: python benchmarks/bench_payloads.py [--students 30] [--segment-words 300]
+"""
+import argparse
+import os
+import random
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from game import LEADERBOARD_TOP_K, ranked_players
+from leaderboard import Leaderboard
+from metrics import payload_size
+from views import HOST, PLAYER, feedback_view, question_view, shuffled_options
+
+
+TIMER_UPDATE = {'remaining_time': 41.732184}
+
+
+def make_round(students, segment_words, rng):
+    words = ['energy', 'plants', 'sunlight', 'chlorophyll', 'glucose', 'oxygen', 'carbon', 'water']
+    question = {
+        'text': 'Which pigment lets plants absorb sunlight during photosynthesis?',
+        'correct_answer': 'Chlorophyll',
+        'incorrect_answers': ['Hemoglobin', 'Melanin', 'Keratin'],
+        'content_segment': ' '.join(rng.choice(words) for _ in range(segment_words)),
+    }
+    answers = [{'player_id': str(i), 'nickname': f'student{i}',
+                'answer': rng.choice([question['correct_answer'], *question['incorrect_answers']])}
+               for i in range(1, students + 1)]
+    return question, answers
+
+
+def before(question, answers, students):
+    room = students + 1
+    total = payload_size({**question, 'timer_duration': 60}) * room
+    for answer in answers:
+        total += payload_size(answer) * room  # answer_submitted
+        total += payload_size(TIMER_UPDATE) * room  # timer_update
+    total += payload_size({'answers': answers}) * room  # show_feedback
+    for answer in answers:
+        total += payload_size({'player_id': answer['player_id'], 'is_correct': True}) * room  # answer_result
+    total += payload_size({}) * room  # feedback_cleared
+    return total
+
+
+def after(question, answers, students):
+    question = {**question, 'options': shuffled_options(question)}
+    total = payload_size(question_view(question, PLAYER, timer_duration=60)) * students
+    for answer in answers:
+        total += payload_size(answer)  # answer_submitted, host only
+        total += payload_size(TIMER_UPDATE)  # timer_update, submitting student only
+    total += payload_size(feedback_view(answers, HOST))
+    total += payload_size(feedback_view(answers, PLAYER)) * students
+    for answer in answers:
+        total += payload_size({'player_id': answer['player_id'], 'is_correct': True}) * 2  # host + that player
+
+    # grading_complete: full ranking to the host, top K to the students, then each student's rank
+    game = {'players': {answer['player_id']: {'nickname': answer['nickname'], 'score': 100 * (i % 4)}
+                        for i, answer in enumerate(answers)}}
+    leaderboard = Leaderboard.from_players(game['players'])
+    total_players = len(leaderboard)
+    total += payload_size({'top': ranked_players(game, leaderboard, total_players), 'total_players': total_players})
+    total += payload_size({'top': ranked_players(game, leaderboard, LEADERBOARD_TOP_K),
+                           'total_players': total_players}) * students  # leaderboard_update
+    for player_id in game['players']:
+        total += payload_size({'rank': leaderboard.rank(player_id), 'score': leaderboard.score(player_id),
+                               'total_players': total_players})  # rank_update
+    total += payload_size({}) * (students + 1)  # feedback_cleared
+    return total
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--segment-words', type=int, default=300,
+                        help='transcript words in a 2-minute window')
+    args = parser.parse_args()
+
+    question, answers = make_round(args.students, args.segment_words, random.Random(7))
+    old_bytes = before(question, answers, args.students)
+    new_bytes = after(question, answers, args.students)
+
+    print(f"students={args.students} segment={len(question['content_segment'])} chars")
+    print(f"before  {old_bytes / 1024:8.1f} KiB per round")
+    print(f"after   {new_bytes / 1024:8.1f} KiB per round ({100 * (1 - new_bytes / old_bytes):.0f}% less)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,236 @@
+"""Benchmark the eventlet and asyncio server modes side by side with concurrent classrooms.
+
+Each mode is started as its own server process (main.py or asgi.py) with a
+seeded transcript cache, so creating games needs no network and no API keys.
+Every simulated classroom has one host and --students players on their own
+Socket.IO connections. A round is the live part of a question:
+broadcast_question -> every student answers -> show_feedback -> the host
+grades each answer -> grading_complete -> every student has its rank_update.
+
+Reported per mode: join latency (REST), question fan-out latency (host emit
+to student receipt), full round time and socket messages handled per second.
+
+Needs python-socketio's asyncio client (aiohttp) on top of the app's
+dependencies. Usage:
+    python benchmarks/bench_server_modes.py [--classrooms 10] [--students 30] [--rounds 5]
+"""
+import argparse
+import asyncio
+import gzip
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+
+import socketio
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER_SCRIPTS = {'eventlet': 'main.py', 'asgi': 'asgi.py'}
+
+VIDEO_ID = 'benchvideo1'
+VIDEO_URL = f'https://www.youtube.com/watch?v={VIDEO_ID}'
+QUESTION = {
+    'text': 'Which pigment makes leaves green?',
+    'correct_answer': 'Chlorophyll',
+    'incorrect_answers': ['Carotene', 'Melanin', 'Hemoglobin'],
+}
+
+
+def seed_transcript(cache_dir):
+    """Write a transcript cache entry in content.py's layout for VIDEO_ID."""
+    entries = [{'text': f'Sentence {i} about photosynthesis.', 'start': i * 5.0, 'duration': 5.0}
+               for i in range(120)]
+    directory = os.path.join(cache_dir, 'transcripts')
+    os.makedirs(directory)
+    with gzip.open(os.path.join(directory, f'{VIDEO_ID}.json.gz'), 'wt', encoding='utf-8') as f:
+        json.dump(entries, f)
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def post_json(url, payload):
+    request = urllib.request.Request(url, data=json.dumps(payload).encode('utf-8'),
+                                     headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request) as response:
+        return json.loads(response.read())
+
+
+def start_server(mode, workdir):
+    port = free_port()
+    env = dict(os.environ, PORT=str(port),
+               CACHE_DIR=os.path.join(workdir, 'cache'),
+               SNAPSHOT_PATH=os.path.join(workdir, f'{mode}.bin'),
+               EVENT_LOG_DIR=os.path.join(workdir, f'{mode}-events'),
+               ASSET_BUILD_DIR=os.path.join(workdir, 'assets'))
+    server = subprocess.Popen([sys.executable, SERVER_SCRIPTS[mode]], cwd=ROOT, env=env,
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f'http://127.0.0.1:{port}'
+    deadline = time.monotonic() + 30
+    while time.monotonic() < deadline:
+        try:
+            urllib.request.urlopen(f'{base_url}/api/metrics').read()
+            return server, base_url
+        except (urllib.error.URLError, ConnectionError):
+            time.sleep(0.05)
+    server.kill()
+    raise RuntimeError(f'{mode} server did not start on port {port}')
+
+
+class Classroom:
+    def __init__(self, base_url, students, stats):
+        self.base_url = base_url
+        self.student_count = students
+        self.stats = stats
+        self.host = socketio.AsyncClient(reconnection=False)
+        self.students = []
+        self.game_code = None
+        self.round_started = 0.0
+        self.answers = 0
+        self.ranks = 0
+        self.all_answered = asyncio.Event()
+        self.all_ranked = asyncio.Event()
+
+    async def setup(self):
+        created = await asyncio.to_thread(post_json, f'{self.base_url}/api/create_game', {'url': VIDEO_URL})
+        self.game_code = created['game_code']
+
+        @self.host.on('answer_submitted')
+        async def on_answer_submitted(data):
+            self.stats['messages'] += 1
+            self.answers += 1
+            if self.answers == self.student_count:
+                self.all_answered.set()
+
+        host_joined = asyncio.Event()
+
+        @self.host.on('room_joined')
+        async def on_room_joined(data):
+            host_joined.set()
+
+        await self.host.connect(self.base_url, transports=['websocket'])
+        await self.host.emit('join_game_room', {'game_code': self.game_code, 'is_host': True})
+        await host_joined.wait()
+
+        for i in range(self.student_count):
+            start = time.perf_counter()
+            joined = await asyncio.to_thread(post_json, f'{self.base_url}/api/join_game',
+                                             {'game_code': self.game_code, 'nickname': f'student{i}'})
+            self.stats['join_ms'].append((time.perf_counter() - start) * 1000)
+            self.students.append(await self._connect_student(joined['player_id']))
+
+    async def _connect_student(self, player_id):
+        client = socketio.AsyncClient(reconnection=False)
+        joined = asyncio.Event()
+
+        @client.on('room_joined')
+        async def on_room_joined(data):
+            joined.set()
+
+        @client.on('new_question')
+        async def on_new_question(data):
+            self.stats['messages'] += 1
+            self.stats['fanout_ms'].append((time.perf_counter() - self.round_started) * 1000)
+            await client.emit('submit_answer', {'game_code': self.game_code, 'player_id': player_id,
+                                                'answer': data['options'][0]})
+
+        @client.on('rank_update')
+        async def on_rank_update(data):
+            self.stats['messages'] += 1
+            self.ranks += 1
+            if self.ranks == self.student_count:
+                self.all_ranked.set()
+
+        await client.connect(self.base_url, transports=['websocket'])
+        await client.emit('join_game_room', {'game_code': self.game_code, 'player_id': player_id})
+        await joined.wait()
+        client.player_id = player_id
+        return client
+
+    async def play_round(self):
+        self.answers = self.ranks = 0
+        self.all_answered.clear()
+        self.all_ranked.clear()
+
+        self.round_started = time.perf_counter()
+        await self.host.emit('broadcast_question', {'game_code': self.game_code, 'question': QUESTION})
+        await self.all_answered.wait()
+        await self.host.emit('show_feedback', {'game_code': self.game_code})
+        for student in self.students:
+            await self.host.emit('answer_result', {'game_code': self.game_code, 'player_id': student.player_id,
+                                                   'is_correct': True})
+        await self.host.emit('grading_complete', {'game_code': self.game_code})
+        await self.all_ranked.wait()
+        self.stats['round_ms'].append((time.perf_counter() - self.round_started) * 1000)
+
+        await self.host.emit('clear_feedback', {'game_code': self.game_code})
+
+    async def close(self):
+        for client in [self.host, *self.students]:
+            await client.disconnect()
+
+
+async def run_classrooms(base_url, args):
+    stats = {'join_ms': [], 'fanout_ms': [], 'round_ms': [], 'messages': 0}
+    classrooms = [Classroom(base_url, args.students, stats) for _ in range(args.classrooms)]
+    await asyncio.gather(*(classroom.setup() for classroom in classrooms))
+
+    start = time.perf_counter()
+    for _ in range(args.rounds):
+        await asyncio.wait_for(asyncio.gather(*(classroom.play_round() for classroom in classrooms)), 120)
+    elapsed = time.perf_counter() - start
+
+    await asyncio.gather(*(classroom.close() for classroom in classrooms))
+    stats['messages_per_s'] = stats['messages'] / elapsed
+    return stats
+
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--classrooms', type=int, default=10)
+    parser.add_argument('--students', type=int, default=30)
+    parser.add_argument('--rounds', type=int, default=5)
+    parser.add_argument('--modes', nargs='+', choices=sorted(SERVER_SCRIPTS), default=['eventlet', 'asgi'])
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as workdir:
+        seed_transcript(os.path.join(workdir, 'cache'))
+        for mode in args.modes:
+            server, base_url = start_server(mode, workdir)
+            try:
+                results[mode] = asyncio.run(run_classrooms(base_url, args))
+            finally:
+                server.terminate()
+                server.wait(timeout=30)
+
+    print(f"{args.classrooms} classrooms x {args.students} students, {args.rounds} rounds")
+    print(f"{'':24}" + ''.join(f"{mode:>12}" for mode in results))
+    rows = [
+        ('join p50 ms', lambda s: statistics.median(s['join_ms'])),
+        ('question fan-out p50 ms', lambda s: statistics.median(s['fanout_ms'])),
+        ('question fan-out p95 ms', lambda s: percentile(s['fanout_ms'], 0.95)),
+        ('round p50 ms', lambda s: statistics.median(s['round_ms'])),
+        ('round p95 ms', lambda s: percentile(s['round_ms'], 0.95)),
+        ('socket messages/s', lambda s: s['messages_per_s']),
+    ]
+    for label, value in rows:
+        print(f"{label:24}" + ''.join(f"{value(stats):12.1f}" for stats in results.values()))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,97 @@
+"""Benchmark snapshot write cost and restore time for a large active_games table.
+
+collect() is what the event loop pays; build() (encode) and write() run in
+the thread pool.
+
+Usage: python benchmarks/bench_snapshots.py [--games 1000] [--players 30]
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from snapshots import SnapshotStore
+
+
+def make_game(players, rng):
+    segment = ' '.join(rng.choice(['photosynthesis', 'energy', 'light', 'plants', 'cells', 'water'])
+                       for _ in range(250))
+    return {
+        'video_id': ''.join(rng.choices('abcdefghijkABCDEFGHIJK0123456789', k=11)),
+        'host_id': None,
+        'players': {
+            str(i): {'nickname': f'student{i}', 'score': rng.randrange(0, 1000, 100),
+                     'join_time': datetime.now().isoformat()}
+            for i in range(1, players + 1)
+        },
+        'player_sockets': {str(i): {'socket_id': f'sid{i}', 'connected': True, 'last_seen': datetime.now()}
+                           for i in range(1, players + 1)},
+        'current_question': {
+            'text': 'What do plants need for photosynthesis?',
+            'correct_answer': 'Light',
+            'incorrect_answers': ['Sound', 'Magnetism', 'Salt'],
+            'content_segment': segment,
+        },
+        'phase': 'answering',
+        'feedback_shown': False,
+        'submitted_answers': [{'player_id': str(i), 'nickname': f'student{i}', 'answer': 'Light'}
+                              for i in range(1, players // 2)],
+        'last_activity': datetime.now(),
+        'timer_end': datetime.now() + timedelta(seconds=40),
+        'current_timer': None,
+        'settings': {'question_interval': 2, 'question_type': 3, 'difficulty': '6'},
+    }
+
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--games', type=int, default=1000)
+    parser.add_argument('--players', type=int, default=30)
+    parser.add_argument('--dirty-fraction', type=float, default=0.1)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    games = {f'G{i:05d}': make_game(args.players, rng) for i in range(args.games)}
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'game_snapshots.bin')
+        store = SnapshotStore(path)
+
+        batch, full_collect_ms = timed(store.collect, games)
+        data, full_ms = timed(store.build, batch)
+        _, write_ms = timed(store.write, data)
+
+        dirty = rng.sample(sorted(games), int(args.games * args.dirty_fraction))
+        for code in dirty:
+            games[code]['players']['1']['score'] += 100
+            store.mark_dirty(code)
+        batch, incr_collect_ms = timed(store.collect, games)
+        data, incr_ms = timed(store.build, batch)
+        _, incr_write_ms = timed(store.write, data)
+
+        restored, load_ms = timed(SnapshotStore(path).load)
+        assert len(restored) == args.games
+
+        print(f"games={args.games} players/game={args.players} snapshot={len(data) / 1024:.1f} KiB")
+        print(f"full collect       {full_collect_ms:8.1f} ms  (on the event loop)")
+        print(f"full encode        {full_ms:8.1f} ms")
+        print(f"full write         {write_ms:8.1f} ms")
+        print(f"incremental collect{incr_collect_ms:8.1f} ms  (on the event loop)")
+        print(f"incremental encode {incr_ms:8.1f} ms  ({len(dirty)} dirty games)")
+        print(f"incremental write  {incr_write_ms:8.1f} ms")
+        print(f"restore            {load_ms:8.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
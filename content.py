@@ -0,0 +1,410 @@
+"""Transcript retrieval, question generation and answer grading, with local caches.
+
+Transcripts are cached per video (in memory and as gzipped JSON on disk)
+together with a start-time index, so any time window can be sliced without
+refetching. Generated questions are cached on disk per video, time window,
+question type and grade level. Both caches are shared by the live app and
+the bulk ingestion CLI (ingest.py).
+
+Every network-bound call has an *_async twin for the asyncio server
+(asgi.py) that uses the async OpenAI and HTTP clients and keeps disk I/O
+on worker threads; request building, parsing and caching are shared.
+"""
+import asyncio
+import bisect
+import gzip
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+
+import metrics
+import prompts
+from providers import get_async_http_client, get_async_openai_client, get_openai_client
+
+CACHE_DIR = os.environ.get("CACHE_DIR", "cache")
+TRANSCRIPT_CACHE_DIR = os.path.join(CACHE_DIR, "transcripts")
+QUESTION_CACHE_DIR = os.path.join(CACHE_DIR, "questions")
+
+SUPADATA_TRANSCRIPT_URL = "https://api.supadata.ai/v1/youtube/transcript"
+
+
+def extract_video_id(url):
+    patterns = [
+        r'(?:youtube\.com\/watch\?v=|youtu.be\/)([^&\n?]*)',
+        r'youtube.com\/embed\/([^&\n?]*)',
+    ]
+
+    for pattern in patterns:
+        match = re.search(pattern, url)
+        if match:
+            return match.group(1)
+    return None
+
+
+class TranscriptIndex:
+    """Transcript entries sorted by start time, for O(log n) window lookups."""
+
+    def __init__(self, entries):
+        entries = sorted(entries, key=lambda entry: entry['start'])
+        self.entries = entries
+        self.starts = [entry['start'] for entry in entries]
+
+    @property
+    def duration(self):
+        if not self.entries:
+            return 0
+        last = self.entries[-1]
+        return last['start'] + last.get('duration', 0)
+
+    def segment(self, start_time, end_time):
+        """Join the text of every entry starting within [start_time, end_time]."""
+        lo = bisect.bisect_left(self.starts, start_time)
+        hi = bisect.bisect_right(self.starts, end_time)
+        return ' '.join(entry['text'] for entry in self.entries[lo:hi])
+
+
+_transcript_indexes = {}
+_transcript_lock = threading.Lock()
+
+
+def _transcript_cache_path(video_id):
+    return os.path.join(TRANSCRIPT_CACHE_DIR, f"{video_id}.json.gz")
+
+
+def _write_json_atomic(path, payload, compress=False):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    data = json.dumps(payload, ensure_ascii=False).encode('utf-8')
+    if compress:
+        data = gzip.compress(data)
+    tmp_path = f"{path}.{threading.get_ident()}.tmp"
+    with open(tmp_path, 'wb') as f:
+        f.write(data)
+    os.replace(tmp_path, path)
+
+
+def _supadata_headers():
+    supadata_api_key = os.environ.get("SUPADATA_API_KEY")
+    if not supadata_api_key:
+        logging.warning("Supadata API key not found in environment variables")
+        return None
+    return {
+        "X-API-Key": supadata_api_key,
+        "Content-Type": "application/json"
+    }
+
+
+def _parse_transcript_response(response):
+    """Turn a Supadata response (requests or httpx) into transcript entries, or None."""
+    if response.status_code != 200:
+        logging.warning(f"Supadata API error: {response.status_code}, {response.text}")
+        return None
+
+    # Parse Supadata response
+    supadata_data = response.json()
+    logging.info(f"Supadata API response keys: {supadata_data.keys()}")
+
+    # Check if the response has the 'content' field as shown in the error message
+    if "content" not in supadata_data:
+        logging.warning(f"Unexpected Supadata API response format: {supadata_data}")
+        return None
+
+    transcript = []
+    for item in supadata_data["content"]:
+        transcript.append({
+            "text": item.get("text", ""),
+            "start": item.get("offset", 0) / 1000,  # Convert milliseconds to seconds
+            "duration": item.get("duration", 0) / 1000  # Convert milliseconds to seconds
+        })
+    logging.info("Supadata API transcript retrieval successful")
+    return transcript
+
+
+def fetch_transcript(video_id):
+    """Fetch the full transcript from the Supadata API, or None on failure."""
+    import requests
+
+    try:
+        logging.info("Attempting Supadata API transcript retrieval")
+        headers = _supadata_headers()
+        if headers is None:
+            return None
+        response = requests.get(SUPADATA_TRANSCRIPT_URL, headers=headers, params={"videoId": video_id})
+        return _parse_transcript_response(response)
+    except Exception as e:
+        logging.error(f"Supadata API failed: {str(e)}")
+        return None
+
+
+async def fetch_transcript_async(video_id):
+    try:
+        logging.info("Attempting Supadata API transcript retrieval")
+        headers = _supadata_headers()
+        if headers is None:
+            return None
+        response = await get_async_http_client().get(SUPADATA_TRANSCRIPT_URL, headers=headers,
+                                                     params={"videoId": video_id})
+        return _parse_transcript_response(response)
+    except Exception as e:
+        logging.error(f"Supadata API failed: {str(e)}")
+        return None
+
+
+def is_transcript_cached(video_id):
+    return video_id in _transcript_indexes or os.path.exists(_transcript_cache_path(video_id))
+
+
+def _load_transcript_index(video_id):
+    path = _transcript_cache_path(video_id)
+    try:
+        with gzip.open(path, 'rt', encoding='utf-8') as f:
+            return TranscriptIndex(json.load(f))
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable transcript cache {path}: {str(e)}")
+        return None
+
+
+def _store_transcript_index(video_id, transcript):
+    index = TranscriptIndex(transcript)
+    try:
+        _write_json_atomic(_transcript_cache_path(video_id), index.entries, compress=True)
+    except OSError as e:
+        logging.warning(f"Could not cache transcript for video {video_id}: {str(e)}")
+    return index
+
+
+def _remember_transcript_index(video_id, index):
+    with _transcript_lock:
+        return _transcript_indexes.setdefault(video_id, index)
+
+
+def get_transcript_index(video_id):
+    """Return the TranscriptIndex for a video from memory, disk or the API."""
+    index = _transcript_indexes.get(video_id)
+    if index is not None:
+        return index
+
+    index = _load_transcript_index(video_id)
+    if index is None:
+        transcript = fetch_transcript(video_id)
+        if transcript is None:
+            logging.error(f"Could not retrieve transcript for video {video_id}")
+            return None
+        index = _store_transcript_index(video_id, transcript)
+
+    return _remember_transcript_index(video_id, index)
+
+
+async def get_transcript_index_async(video_id):
+    index = _transcript_indexes.get(video_id)
+    if index is not None:
+        return index
+
+    index = await asyncio.to_thread(_load_transcript_index, video_id)
+    if index is None:
+        transcript = await fetch_transcript_async(video_id)
+        if transcript is None:
+            logging.error(f"Could not retrieve transcript for video {video_id}")
+            return None
+        index = await asyncio.to_thread(_store_transcript_index, video_id, transcript)
+
+    return _remember_transcript_index(video_id, index)
+
+
+def get_transcript_segment(video_id, start_time, end_time):
+    try:
+        # Log the attempt
+        logging.info(f"Attempting to get transcript for video {video_id} from {start_time}s to {end_time}s")
+
+        index = get_transcript_index(video_id)
+        if index is None:
+            return None
+
+        result = index.segment(start_time, end_time)
+        logging.info(f"Successfully retrieved transcript segment for video {video_id} from {start_time}s to {end_time}s")
+        return result
+    except Exception as e:
+        logging.error(f"Unexpected error getting transcript for video {video_id}: {str(e)}")
+        return None
+
+
+async def get_transcript_segment_async(video_id, start_time, end_time):
+    try:
+        logging.info(f"Attempting to get transcript for video {video_id} from {start_time}s to {end_time}s")
+
+        index = await get_transcript_index_async(video_id)
+        if index is None:
+            return None
+
+        result = index.segment(start_time, end_time)
+        logging.info(f"Successfully retrieved transcript segment for video {video_id} from {start_time}s to {end_time}s")
+        return result
+    except Exception as e:
+        logging.error(f"Unexpected error getting transcript for video {video_id}: {str(e)}")
+        return None
+
+
+def question_cache_key(video_id, start_time, end_time, question_type, grade_level):
+    raw = f"{video_id}:{float(start_time):g}:{float(end_time):g}:{int(question_type)}:{grade_level}"
+    return hashlib.sha256(raw.encode('utf-8')).hexdigest()[:32]
+
+
+def _question_cache_path(key):
+    return os.path.join(QUESTION_CACHE_DIR, f"{key}.json")
+
+
+def get_cached_question(video_id, start_time, end_time, question_type, grade_level):
+    path = _question_cache_path(question_cache_key(video_id, start_time, end_time, question_type, grade_level))
+    try:
+        with open(path, encoding='utf-8') as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+    except (OSError, ValueError) as e:
+        logging.warning(f"Ignoring unreadable question cache {path}: {str(e)}")
+        return None
+
+
+def _question_request(grade_level, question_type, content_segment):
+    return {
+        "model": prompts.MODEL,
+        "messages": prompts.question_messages(grade_level, question_type, content_segment),
+        "functions": prompts.question_functions(),
+        "function_call": {"name": prompts.FUNCTION_NAME},
+    }
+
+
+def _question_from_completion(completion, content_segment):
+    from schemas import ReflectionClosedPromptResponse
+
+    reflection_prompt = ReflectionClosedPromptResponse.model_validate_json(
+        completion.choices[0].message.function_call.arguments
+    )
+
+    return {
+        "reflective_question": reflection_prompt.reflection_prompt.question,
+        "correct_answer": reflection_prompt.reflection_prompt.correct_answer,
+        "incorrect_answers": reflection_prompt.reflection_prompt.incorrect_answers,
+        "content_segment": content_segment
+    }
+
+
+def _cache_question(video_id, start_time, end_time, question_type, grade_level, question):
+    key = question_cache_key(video_id, start_time, end_time, question_type, grade_level)
+    try:
+        _write_json_atomic(_question_cache_path(key), question)
+    except OSError as e:
+        logging.warning(f"Could not cache question for video {video_id}: {str(e)}")
+
+
+def generate_question(video_id, start_time, end_time, question_type=3, grade_level="6", game_code=None):
+    """Return a multiple-choice question for a transcript window, using the cache.
+
+    Returns None if the transcript window is unavailable or empty. Token usage
+    is accounted to game_code (if given) and video_id.
+    """
+    cached = get_cached_question(video_id, start_time, end_time, question_type, grade_level)
+    if cached is not None:
+        logging.info(f"Question cache hit for video {video_id} from {start_time}s to {end_time}s")
+        return cached
+
+    content_segment = get_transcript_segment(video_id, start_time, end_time)
+    if not content_segment:
+        return None
+
+    completion = get_openai_client().chat.completions.create(
+        **_question_request(grade_level, question_type, content_segment)
+    )
+    metrics.record_usage('generate_question', prompts.MODEL, completion.usage,
+                         game_code=game_code, video_id=video_id)
+
+    question = _question_from_completion(completion, content_segment)
+    _cache_question(video_id, start_time, end_time, question_type, grade_level, question)
+    return question
+
+
+async def generate_question_async(video_id, start_time, end_time, question_type=3, grade_level="6", game_code=None):
+    cached = await asyncio.to_thread(get_cached_question, video_id, start_time, end_time, question_type, grade_level)
+    if cached is not None:
+        logging.info(f"Question cache hit for video {video_id} from {start_time}s to {end_time}s")
+        return cached
+
+    content_segment = await get_transcript_segment_async(video_id, start_time, end_time)
+    if not content_segment:
+        return None
+
+    completion = await get_async_openai_client().chat.completions.create(
+        **_question_request(grade_level, question_type, content_segment)
+    )
+    metrics.record_usage('generate_question', prompts.MODEL, completion.usage,
+                         game_code=game_code, video_id=video_id)
+
+    question = _question_from_completion(completion, content_segment)
+    await asyncio.to_thread(_cache_question, video_id, start_time, end_time, question_type, grade_level, question)
+    return question
+
+
+def _check_answer_request(content_segment, question, answer):
+    return {
+        "model": prompts.MODEL,
+        "messages": prompts.check_answer_messages(content_segment, question, answer),
+        "functions": prompts.check_answer_functions(),
+        "function_call": {"name": prompts.FUNCTION_NAME},
+    }
+
+
+def _answer_result(answer_data, completion):
+    from schemas import RefectionSinglePromptResponse
+
+    reflection_prompt = RefectionSinglePromptResponse.model_validate_json(
+        completion.choices[0].message.function_call.arguments
+    )
+
+    return {
+        "player_id": answer_data["player_id"],
+        "answer": answer_data["answer"],
+        "is_correct": reflection_prompt.reflection_prompt.is_correct,
+        "explanation": reflection_prompt.reflection_prompt.explanation,
+    }
+
+
+def check_answer(content_segment, question, answer_data, game_code=None, video_id=None):
+    """Grade one student's answer ({'player_id', 'answer'}) against the question and its context."""
+    completion = get_openai_client().chat.completions.create(
+        **_check_answer_request(content_segment, question, answer_data['answer'])
+    )
+    metrics.record_usage('check_answer', prompts.MODEL, completion.usage,
+                         game_code=game_code, video_id=video_id)
+    return _answer_result(answer_data, completion)
+
+
+async def check_answer_async(content_segment, question, answer_data, game_code=None, video_id=None):
+    completion = await get_async_openai_client().chat.completions.create(
+        **_check_answer_request(content_segment, question, answer_data['answer'])
+    )
+    metrics.record_usage('check_answer', prompts.MODEL, completion.usage,
+                         game_code=game_code, video_id=video_id)
+    return _answer_result(answer_data, completion)
+
+
+def translate(text, target_language, game_code=None, video_id=None):
+    """Translate text for display and return the translation."""
+    completion = get_openai_client().chat.completions.create(
+        model=prompts.MODEL,
+        messages=prompts.translate_messages(text, target_language)
+    )
+    metrics.record_usage('translate', prompts.MODEL, completion.usage, game_code=game_code, video_id=video_id)
+    return completion.choices[0].message.content
+
+
+async def translate_async(text, target_language, game_code=None, video_id=None):
+    completion = await get_async_openai_client().chat.completions.create(
+        model=prompts.MODEL,
+        messages=prompts.translate_messages(text, target_language)
+    )
+    metrics.record_usage('translate', prompts.MODEL, completion.usage, game_code=game_code, video_id=video_id)
+    return completion.choices[0].message.content
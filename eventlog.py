@@ -0,0 +1,130 @@
+"""Append-only per-game event log.
+
+Handlers call EventLog.append(), which only adds a tuple to an in-memory
+buffer. A background task periodically hands the buffer to write(), which
+serializes and appends it to per-game segment files
+(<directory>/<game_code>/<seq>.jsonl) off the event loop. Segments are
+never rewritten, and they outlive the in-memory game so results can be
+exported after class.
+"""
+import csv
+import io
+import json
+import os
+import re
+import time
+import zlib
+
+from profiling import unpatched
+
+GAME_CODE_PATTERN = re.compile(r'^[A-Z0-9]{6}$')
+
+CSV_COLUMNS = ('ts', 'event', 'question_index', 'player_id', 'nickname', 'answer',
+               'is_correct', 'elapsed_ms', 'detail')
+EXPORT_FORMATS = ('csv', 'jsonl')
+
+
+class EventLog:
+    def __init__(self, directory, segment_bytes=1024 * 1024):
+        self.directory = directory
+        self.segment_bytes = segment_bytes
+        self._pending = []
+        self._segments = {}  # game_code -> (segment path, size in bytes)
+        # write() runs on worker threads; a green lock under eventlet would never wake them
+        self._write_lock = unpatched('threading').Lock()
+
+    def append(self, game_code, event, **fields):
+        """Buffer one event. Cheap enough to call on every socket message."""
+        self._pending.append((game_code, time.time(), event, fields))
+
+    def take_pending(self):
+        batch, self._pending = self._pending, []
+        return batch
+
+    def _game_dir(self, game_code):
+        if not GAME_CODE_PATTERN.match(game_code):
+            raise ValueError(f"Invalid game code: {game_code!r}")
+        return os.path.join(self.directory, game_code)
+
+    def segments(self, game_code):
+        """Sorted segment paths for a game ([] if it never logged anything)."""
+        try:
+            game_dir = self._game_dir(game_code)
+            names = os.listdir(game_dir)
+        except (ValueError, FileNotFoundError):
+            return []
+        return [os.path.join(game_dir, name) for name in sorted(names) if name.endswith('.jsonl')]
+
+    def _current_segment(self, game_code):
+        if game_code not in self._segments:
+            existing = self.segments(game_code)
+            if existing:
+                self._segments[game_code] = (existing[-1], os.path.getsize(existing[-1]))
+            else:
+                os.makedirs(self._game_dir(game_code), exist_ok=True)
+                self._segments[game_code] = (os.path.join(self._game_dir(game_code), '000000.jsonl'), 0)
+
+        path, size = self._segments[game_code]
+        if size >= self.segment_bytes:
+            seq = int(os.path.basename(path).split('.')[0]) + 1
+            path, size = os.path.join(self._game_dir(game_code), f'{seq:06d}.jsonl'), 0
+            self._segments[game_code] = (path, size)
+        return path, size
+
+    def write(self, batch):
+        """Append a batch of buffered events to the segment files. Blocking I/O."""
+        by_game = {}
+        for game_code, ts, event, fields in batch:
+            record = {'ts': round(ts, 3), 'event': event, **fields}
+            line = json.dumps(record, separators=(',', ':'), ensure_ascii=False, default=str)
+            by_game.setdefault(game_code, []).append(line + '\n')
+
+        with self._write_lock:
+            for game_code, lines in by_game.items():
+                data = ''.join(lines).encode('utf-8')
+                path, size = self._current_segment(game_code)
+                with open(path, 'ab') as f:
+                    f.write(data)
+                self._segments[game_code] = (path, size + len(data))
+
+    def flush(self):
+        batch = self.take_pending()
+        if batch:
+            self.write(batch)
+
+    def iter_records(self, game_code):
+        """Stream a game's events in order, one segment line at a time."""
+        for path in self.segments(game_code):
+            with open(path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        yield json.loads(line)
+
+    def export(self, game_code, fmt='jsonl', chunk_bytes=64 * 1024):
+        """Yield a gzip-compressed CSV or JSONL export of a game's events."""
+        if fmt not in EXPORT_FORMATS:
+            raise ValueError(f"Unsupported export format: {fmt}")
+
+        compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # wbits=31 -> gzip container
+        buffer = io.StringIO()
+        writer = None
+        if fmt == 'csv':
+            writer = csv.DictWriter(buffer, fieldnames=CSV_COLUMNS, extrasaction='ignore')
+            writer.writeheader()
+
+        for record in self.iter_records(game_code):
+            if writer:
+                extra = {key: value for key, value in record.items() if key not in CSV_COLUMNS}
+                writer.writerow({**record, 'detail': json.dumps(extra, ensure_ascii=False) if extra else ''})
+            else:
+                buffer.write(json.dumps(record, ensure_ascii=False))
+                buffer.write('\n')
+
+            if buffer.tell() >= chunk_bytes:
+                chunk = compressor.compress(buffer.getvalue().encode('utf-8'))
+                buffer.seek(0)
+                buffer.truncate()
+                if chunk:
+                    yield chunk
+
+        yield compressor.compress(buffer.getvalue().encode('utf-8')) + compressor.flush()
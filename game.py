@@ -0,0 +1,645 @@
+"""Game state and Socket.IO event handlers, independent of the serving stack.
+
+main.py (Flask-SocketIO on eventlet) and asgi.py (python-socketio on asyncio)
+both route their socket events to the handlers in SOCKET_HANDLERS. Each
+server installs a transport with set_transport(); handlers only talk to
+sockets through it:
+
+    emit(event, payload, room)   send to a room or a single sid
+    enter_room(sid, room)        add a socket to a room, immediately
+    room_size(room)              number of sockets in a room
+    call_later(delay, callback)  run callback later; returns an object with cancel()
+
+Handlers are plain functions that never block, so either server can call
+them directly on its event loop.
+"""
+import logging
+import os
+import random
+import string
+import time
+from datetime import datetime, timedelta
+
+import metrics
+from eventlog import EventLog
+from leaderboard import Leaderboard
+from snapshots import SnapshotStore
+from views import AUDIENCES, HOST, PLAYER, SPECTATOR, audience_room, feedback_view, question_view, shuffled_options
+
+# Store active games in memory
+active_games = {}  # Add feedback_shown flag when creating new game
+
+# Periodic snapshots of active_games so a restart doesn't lose live classrooms
+SNAPSHOT_PATH = os.environ.get("SNAPSHOT_PATH", "game_snapshots.bin")
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", 5))
+snapshot_store = SnapshotStore(SNAPSHOT_PATH)
+
+# Append-only per-game event log, flushed to segment files in batches
+EVENT_LOG_DIR = os.environ.get("EVENT_LOG_DIR", "event_logs")
+EVENT_LOG_FLUSH_INTERVAL = float(os.environ.get("EVENT_LOG_FLUSH_INTERVAL", 1))
+event_log = EventLog(EVENT_LOG_DIR)
+
+# Number of players in the leaderboard_update sent to players and spectators (the host gets all)
+LEADERBOARD_TOP_K = int(os.environ.get("LEADERBOARD_TOP_K", 10))
+
+# Set by the serving module before any handler runs
+transport = None
+
+
+def set_transport(new_transport):
+    global transport
+    transport = new_transport
+
+
+def generate_game_code():
+    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
+
+
+def emit_to_audience(event, payload, game_code, audience):
+    """Emit to one audience room of a game and record the payload size."""
+    room = audience_room(game_code, audience)
+    recipients = transport.room_size(room)
+    if not recipients:
+        return
+    metrics.record_payload(event, audience, metrics.payload_size(payload), recipients)
+    transport.emit(event, payload, room)
+
+
+def emit_to_socket(event, payload, sid, audience):
+    """Emit to a single socket and record the payload size."""
+    metrics.record_payload(event, audience, metrics.payload_size(payload))
+    transport.emit(event, payload, sid)
+
+
+def emit_to_game(event, payload, game_code):
+    """Emit to every socket in a game: one metered emit per audience room."""
+    for audience in AUDIENCES:
+        emit_to_audience(event, payload, game_code, audience)
+
+
+def get_leaderboard(game):
+    """Return the game's leaderboard, rebuilding it from player scores if missing (e.g. after a restore)."""
+    if 'leaderboard' not in game:
+        game['leaderboard'] = Leaderboard.from_players(game['players'])
+    return game['leaderboard']
+
+
+# REST route cores shared by both servers
+def create_game(video_id, question_interval, question_type, grade_level):
+    """Register a new game in the lobby phase and return its code."""
+    game_code = generate_game_code()
+    while game_code in active_games:
+        game_code = generate_game_code()
+
+    active_games[game_code] = {
+        'video_id': video_id,
+        'host_id': None,
+        'players': {},
+        'player_sockets': {},
+        'current_question': None,
+        'phase': 'lobby',
+        'feedback_shown': False,
+        'submitted_answers': [],
+        'last_activity': datetime.now(),
+        'leaderboard': Leaderboard(),
+        'settings': {
+            'question_interval': question_interval,
+            'question_type': question_type,
+            'difficulty': grade_level
+        }
+    }
+
+    snapshot_store.mark_dirty(game_code)
+    event_log.append(game_code, 'game_created', video_id=video_id,
+                     settings=active_games[game_code]['settings'])
+    return game_code
+
+
+def add_player(game_code, nickname):
+    """Add a player to an existing game, announce them to the room and return their id."""
+    # Generate a unique player ID with more resilience
+    # Get the highest existing player ID and add 1
+    existing_ids = [int(pid) for pid in active_games[game_code]['players'].keys() if pid.isdigit()]
+    next_id = 1 if not existing_ids else max(existing_ids) + 1
+    player_id = str(next_id)
+
+    # Store player in game
+    active_games[game_code]['players'][player_id] = {
+        'nickname': nickname,
+        'score': 0,
+        'join_time': datetime.now().isoformat()
+    }
+    get_leaderboard(active_games[game_code]).set_score(player_id, 0)
+
+    # Initialize player_sockets if it doesn't exist
+    if 'player_sockets' not in active_games[game_code]:
+        active_games[game_code]['player_sockets'] = {}
+
+    # Update last activity timestamp
+    active_games[game_code]['last_activity'] = datetime.now()
+    snapshot_store.mark_dirty(game_code)
+    event_log.append(game_code, 'player_joined', player_id=player_id, nickname=nickname)
+
+    logging.info(f"Player {player_id} ({nickname}) joined game {game_code}")
+
+    # Notify all clients in the room about the new player
+    emit_to_game('player_joined', {
+        'nickname': nickname,
+        'player_id': player_id
+    }, game_code)
+    return player_id
+
+
+# Socket.IO event handlers
+def start_answer_timer(game_code, duration=60.0):
+    """Start a timer for the current question. After `duration` seconds (60 by default), trigger feedback."""
+    def timer_callback():
+        try:
+            if game_code in active_games and active_games[game_code]['phase'] == 'answering':
+                logging.info(f"Timer expired for game {game_code}. Automatically showing feedback.")
+                handle_show_feedback(None, {'game_code': game_code})
+            else:
+                logging.info(f"Timer expired for game {game_code}, but game is no longer in answering phase.")
+        except Exception as e:
+            logging.error(f"Error in timer callback for game {game_code}: {str(e)}")
+
+    # Cancel any existing timer first to prevent overlaps
+    if game_code in active_games and 'current_timer' in active_games[game_code] and active_games[game_code]['current_timer']:
+        try:
+            active_games[game_code]['current_timer'].cancel()
+            logging.info(f"Cancelled existing timer for game {game_code}")
+        except:
+            logging.warning(f"Failed to cancel existing timer for game {game_code}")
+
+    # Create and store the new timer
+    timer = transport.call_later(duration, timer_callback)
+
+    # Store timer and end time in game state
+    active_games[game_code]['current_timer'] = timer
+    active_games[game_code]['timer_end'] = datetime.now() + timedelta(seconds=duration)
+    active_games[game_code]['answers_timer_started'] = True
+
+    logging.info(f"Started {duration:.0f}-second answer timer for game {game_code}")
+
+
+def handle_connect(sid):
+    logging.info(f'Client connected: {sid}')
+
+
+def handle_disconnect(sid):
+    """Handle client disconnection."""
+    logging.info(f'Client disconnected: {sid}')
+
+    # Try to recover disconnected players
+    for game_code, game in active_games.items():
+        # Check if this socket is in this game
+        for player_id, player_data in game.get('player_sockets', {}).items():
+            if player_data.get('socket_id') == sid:
+                logging.info(f'Player {player_id} disconnected from game {game_code}')
+                # Don't remove the player immediately, allow reconnection
+                player_data['connected'] = False
+                player_data['last_seen'] = datetime.now()
+                # Notify other players
+                emit_to_game('player_disconnected', {
+                    'player_id': player_id,
+                    'nickname': game['players'][player_id]['nickname']
+                }, game_code)
+                break
+
+
+def handle_join_room(sid, data):
+    game_code = data['game_code']
+    player_id = data.get('player_id')
+    is_host = data.get('is_host', False)
+    audience = HOST if is_host else PLAYER if player_id else SPECTATOR
+
+    logging.info(f'Socket {sid} attempting to join game room {game_code} - Player ID: {player_id}, Is Host: {is_host}')
+
+    if game_code not in active_games:
+        logging.warning(f'Attempt to join non-existent game: {game_code}')
+        emit_to_socket('join_error', {'error': 'Game does not exist'}, sid, audience)
+        return
+
+    # Join the socket to the game's room
+    transport.enter_room(sid, game_code)
+    logging.info(f'Socket {sid} joined room {game_code}')
+
+    # Initialize player_sockets dictionary if it doesn't exist
+    if 'player_sockets' not in active_games[game_code]:
+        active_games[game_code]['player_sockets'] = {}
+
+    # Update last activity timestamp
+    active_games[game_code]['last_activity'] = datetime.now()
+    snapshot_store.mark_dirty(game_code)
+
+    # If this is the host
+    if is_host:
+        logging.info(f'Host connected to game {game_code} with socket {sid}')
+        active_games[game_code]['host_socket_id'] = sid
+        transport.enter_room(sid, audience_room(game_code, HOST))
+
+        # Send current game state to the host
+        emit_to_socket('game_state_update', {
+            'state': active_games[game_code].get('phase', 'lobby'),
+            'players': [{'id': pid, 'nickname': p['nickname'], 'score': p.get('score', 0)}
+                       for pid, p in active_games[game_code]['players'].items()],
+            'current_question': question_view(active_games[game_code].get('current_question'), HOST)
+        }, sid, HOST)
+
+    # If this is a player (not just a spectator/host)
+    elif player_id and player_id in active_games[game_code]['players']:
+        player_nickname = active_games[game_code]['players'][player_id]['nickname']
+        logging.info(f'Player {player_id} ({player_nickname}) connected with socket {sid} in game {game_code}')
+
+        transport.enter_room(sid, audience_room(game_code, PLAYER))
+
+        # Track this socket for the player
+        active_games[game_code]['player_sockets'][player_id] = {
+            'socket_id': sid,
+            'connected': True,
+            'last_seen': datetime.now()
+        }
+
+        # If this was a reconnection, update status and notify everyone
+        emit_to_game('player_reconnected', {
+            'player_id': player_id,
+            'nickname': player_nickname
+        }, game_code)
+
+        # Send current game state to the reconnecting player
+        game_state = active_games[game_code].get('phase', 'lobby')
+        current_question = active_games[game_code].get('current_question', None)
+
+        leaderboard = get_leaderboard(active_games[game_code])
+        emit_to_socket('game_state_update', {
+            'state': game_state,
+            'question': question_view(current_question, PLAYER),
+            'score': leaderboard.score(player_id),
+            'rank': leaderboard.rank(player_id),
+            'total_players': len(leaderboard)
+        }, sid, PLAYER)
+
+        # If game is in progress, send the current question with the time left on it
+        if game_state == 'answering' and current_question:
+            remaining_time = 60
+            if 'timer_end' in active_games[game_code]:
+                remaining_time = max(0, (active_games[game_code]['timer_end'] - datetime.now()).total_seconds())
+            emit_to_socket('new_question', question_view(current_question, PLAYER, timer_duration=remaining_time),
+                           sid, PLAYER)
+        elif game_state == 'feedback' and 'feedback_data' in active_games[game_code]:
+            emit_to_socket('answer_results', active_games[game_code]['feedback_data'], sid, PLAYER)
+
+    # Anyone else in the room only watches
+    else:
+        audience = SPECTATOR
+        transport.enter_room(sid, audience_room(game_code, SPECTATOR))
+
+    # Confirm room join to the client that just connected
+    emit_to_socket('room_joined', {'game_code': game_code}, sid, audience)
+
+
+def handle_start_game(sid, data):
+    game_code = data['game_code']
+    # Capture the question settings if provided
+    question_interval = data.get('question_interval')
+    question_type = data.get('question_type')
+
+    if game_code in active_games:
+        active_games[game_code]['phase'] = 'playing'
+
+        # Update settings if provided
+        if question_interval is not None:
+            active_games[game_code]['settings']['question_interval'] = question_interval
+        if question_type is not None:
+            active_games[game_code]['settings']['question_type'] = question_type
+
+        snapshot_store.mark_dirty(game_code)
+        event_log.append(game_code, 'game_started')
+        emit_to_game('game_started', {}, game_code)
+
+
+def handle_show_feedback(sid, data):
+    """Handle manual triggering of feedback stage."""
+    try:
+        game_code = data['game_code']
+        if game_code not in active_games:
+            logging.warning(f"Show feedback called for non-existent game: {game_code}")
+            return
+
+        # Make sure we don't process feedback twice
+        if active_games[game_code].get('feedback_shown', False) and active_games[game_code]['phase'] == 'feedback':
+            logging.info(f"Game {game_code}: Feedback already shown, ignoring duplicate request")
+            return
+
+        logging.info(f"Game {game_code}: Processing feedback request")
+
+        # Cancel timer if it exists
+        if 'current_timer' in active_games[game_code] and active_games[game_code]['current_timer']:
+            try:
+                active_games[game_code]['current_timer'].cancel()
+                logging.info(f"Game {game_code}: Cancelled answer timer")
+            except:
+                logging.warning(f"Game {game_code}: Failed to cancel timer")
+            active_games[game_code]['current_timer'] = None
+
+        # Change phase to feedback and set feedback flag
+        active_games[game_code]['phase'] = 'feedback'
+        active_games[game_code]['feedback_shown'] = True
+        snapshot_store.mark_dirty(game_code)
+        event_log.append(game_code, 'feedback_shown',
+                         question_index=active_games[game_code].get('question_index'),
+                         answer_count=len(active_games[game_code].get('submitted_answers', [])),
+                         player_count=len(active_games[game_code]['players']))
+
+        # Prepare the answers - ensure we have a valid list even if none were submitted
+        if 'submitted_answers' not in active_games[game_code]:
+            active_games[game_code]['submitted_answers'] = []
+
+        submitted_answers = active_games[game_code]['submitted_answers']
+
+        # Log details for debugging
+        player_count = len(active_games[game_code]['players'])
+        answer_count = len(submitted_answers)
+        logging.info(f"Game {game_code}: Showing feedback for {answer_count}/{player_count} players who submitted answers")
+
+        # Create a detailed log of which players submitted answers
+        if answer_count > 0:
+            player_names = [ans['nickname'] for ans in submitted_answers]
+            logging.info(f"Game {game_code}: Answers from: {', '.join(player_names)}")
+
+        # Host gets every answer to grade; students and spectators only get the count
+        for audience in AUDIENCES:
+            emit_to_audience('show_feedback', feedback_view(submitted_answers, audience), game_code, audience)
+
+        logging.info(f"Game {game_code}: Feedback show event emitted successfully")
+    except Exception as e:
+        logging.error(f"Error handling show_feedback: {str(e)}")
+        # Try to recover if possible by sending a basic response
+        try:
+            if 'game_code' in data and data['game_code'] in active_games:
+                emit_to_game('show_feedback', {'answers': []}, data['game_code'])
+                logging.info(f"Sent recovery feedback response to game {data['game_code']}")
+        except:
+            logging.error("Failed to send recovery feedback response")
+
+
+def handle_submit_answer(sid, data):
+    game_code = data['game_code']
+    player_id = data['player_id']
+    answer = data['answer']
+
+    logging.info(f"Player {player_id} submitting answer in game {game_code}")
+
+    if game_code in active_games and player_id in active_games[game_code]['players']:
+        # Check if feedback has been shown for the current question
+        if active_games[game_code].get('feedback_shown', False):
+            logging.info(f"Answer rejected - feedback already shown for game {game_code}")
+            emit_to_socket('answer_rejected', {
+                'reason': 'Feedback has already been shown'
+            }, sid, PLAYER)
+            return
+
+        # Store the answer
+        if 'submitted_answers' not in active_games[game_code]:
+            active_games[game_code]['submitted_answers'] = []
+
+        # Check if player already submitted an answer
+        existing_answer_index = None
+        for i, existing_answer in enumerate(active_games[game_code]['submitted_answers']):
+            if existing_answer['player_id'] == player_id:
+                existing_answer_index = i
+                break
+
+        if existing_answer_index is not None:
+            # Update existing answer
+            active_games[game_code]['submitted_answers'][existing_answer_index]['answer'] = answer
+            logging.info(f"Updated answer for player {player_id} in game {game_code}")
+        else:
+            # Add new answer
+            active_games[game_code]['submitted_answers'].append({
+                'player_id': player_id,
+                'nickname': active_games[game_code]['players'][player_id]['nickname'],
+                'answer': answer
+            })
+            logging.info(f"Added new answer for player {player_id} in game {game_code}")
+
+        snapshot_store.mark_dirty(game_code)
+        started_at = active_games[game_code].get('question_started_at')
+        event_log.append(game_code, 'answer_submitted',
+                         question_index=active_games[game_code].get('question_index'),
+                         player_id=player_id,
+                         nickname=active_games[game_code]['players'][player_id]['nickname'],
+                         answer=answer,
+                         elapsed_ms=round((time.time() - started_at) * 1000) if started_at else None)
+
+        # Only the host needs to see individual answers
+        emit_to_audience('answer_submitted', {
+            'player_id': player_id,
+            'nickname': active_games[game_code]['players'][player_id]['nickname'],
+            'answer': answer
+        }, game_code, HOST)
+
+        # Resync the submitting student's clock; nobody else's changed
+        if 'timer_end' in active_games[game_code]:
+            remaining_time = (active_games[game_code]['timer_end'] - datetime.now()).total_seconds()
+            emit_to_socket('timer_update', {'remaining_time': max(0, remaining_time)}, sid, PLAYER)
+
+
+def handle_broadcast_question(sid, data):
+    game_code = data['game_code']
+
+    if game_code in active_games:
+        logging.info(f"Broadcasting new question in game {game_code}")
+        question_data = dict(data.get('question') or {})
+        question_data['options'] = shuffled_options(question_data)
+
+        # Reset submitted answers and feedback flag
+        active_games[game_code]['submitted_answers'] = []
+        active_games[game_code]['phase'] = 'answering'
+        active_games[game_code]['current_question'] = question_data
+        active_games[game_code]['feedback_shown'] = False  # Reset feedback flag
+        active_games[game_code]['question_index'] = active_games[game_code].get('question_index', 0) + 1
+        active_games[game_code]['question_started_at'] = time.time()
+        snapshot_store.mark_dirty(game_code)
+        event_log.append(game_code, 'question',
+                         question_index=active_games[game_code]['question_index'],
+                         text=question_data.get('text'),
+                         correct_answer=question_data.get('correct_answer'),
+                         options=question_data['options'])
+
+        # Start the timer
+        start_answer_timer(game_code)
+
+        # Students and spectators get the question and options only; the host already has it all
+        for audience in (PLAYER, SPECTATOR):
+            emit_to_audience('new_question', question_view(question_data, audience, timer_duration=60),
+                             game_code, audience)
+
+        logging.info(f"Question broadcast complete for game {game_code}")
+
+
+def handle_answer_result(sid, data):
+    game_code = data['game_code']
+    player_id = data['player_id']
+    is_correct = data['is_correct']
+
+    if game_code in active_games and player_id in active_games[game_code]['players']:
+        if is_correct:
+            player = active_games[game_code]['players'][player_id]
+            player['score'] += 100
+            get_leaderboard(active_games[game_code]).set_score(player_id, player['score'])
+            snapshot_store.mark_dirty(game_code)
+
+        event_log.append(game_code, 'answer_graded',
+                         question_index=active_games[game_code].get('question_index'),
+                         player_id=player_id,
+                         nickname=active_games[game_code]['players'][player_id]['nickname'],
+                         is_correct=is_correct)
+
+        # Only the graded player and the host care about an individual result
+        result = {
+            'player_id': player_id,
+            'is_correct': is_correct
+        }
+        emit_to_audience('answer_result', result, game_code, HOST)
+        socket_data = active_games[game_code].get('player_sockets', {}).get(player_id)
+        if socket_data and socket_data.get('connected'):
+            emit_to_socket('answer_result', result, socket_data['socket_id'], PLAYER)
+
+
+def ranked_players(game, leaderboard, k):
+    """The k best players of a game as leaderboard_update entries, best first."""
+    return [{
+        'player_id': player_id,
+        'nickname': game['players'][player_id]['nickname'],
+        'score': score,
+        'rank': leaderboard.rank(player_id)
+    } for player_id, score in leaderboard.top(k)]
+
+
+def handle_grading_complete(sid, data):
+    """Send the full ranking to the host, the top K to everyone else and each player's own rank."""
+    game_code = data['game_code']
+    if game_code not in active_games:
+        logging.warning(f"Grading complete called for non-existent game: {game_code}")
+        return
+
+    game = active_games[game_code]
+    leaderboard = get_leaderboard(game)
+    total_players = len(leaderboard)
+
+    # The host's scoreboard lists every player; students and spectators only need the top K
+    top = ranked_players(game, leaderboard, LEADERBOARD_TOP_K)
+    for audience in AUDIENCES:
+        ranking = ranked_players(game, leaderboard, total_players) if audience == HOST else top
+        emit_to_audience('leaderboard_update', {'top': ranking, 'total_players': total_players}, game_code, audience)
+
+    for player_id, socket_data in game.get('player_sockets', {}).items():
+        if not socket_data.get('connected') or player_id not in leaderboard:
+            continue
+        emit_to_socket('rank_update', {
+            'rank': leaderboard.rank(player_id),
+            'score': leaderboard.score(player_id),
+            'total_players': total_players
+        }, socket_data['socket_id'], PLAYER)
+
+    logging.info(f"Game {game_code}: Sent leaderboard for {total_players} players")
+
+
+def handle_clear_feedback(sid, data):
+    """Handle clearing of feedback when host continues the video."""
+    try:
+        game_code = data['game_code']
+        if game_code not in active_games:
+            logging.warning(f"Clear feedback called for non-existent game: {game_code}")
+            return
+
+        logging.info(f"Game {game_code}: Processing clear feedback request")
+
+        # Reset all question and feedback-related state
+        active_games[game_code]['feedback_shown'] = False
+        active_games[game_code]['phase'] = 'playing'
+        active_games[game_code]['current_question'] = None
+
+        # Ensure submitted_answers exists and is empty
+        active_games[game_code]['submitted_answers'] = []
+
+        # Cancel any lingering timers
+        if 'current_timer' in active_games[game_code] and active_games[game_code]['current_timer']:
+            try:
+                active_games[game_code]['current_timer'].cancel()
+            except:
+                pass
+            active_games[game_code]['current_timer'] = None
+
+        # Update activity timestamp
+        active_games[game_code]['last_activity'] = datetime.now()
+        snapshot_store.mark_dirty(game_code)
+        event_log.append(game_code, 'feedback_cleared', question_index=active_games[game_code].get('question_index'))
+
+        # Notify all players that feedback has been cleared
+        logging.info(f"Game {game_code}: Clearing feedback state")
+        emit_to_game('feedback_cleared', {}, game_code)
+
+        logging.info(f"Game {game_code}: Feedback cleared successfully")
+    except Exception as e:
+        logging.error(f"Error handling clear_feedback: {str(e)}")
+        # Try to recover if possible
+        try:
+            if 'game_code' in data and data['game_code'] in active_games:
+                emit_to_game('feedback_cleared', {}, data['game_code'])
+                logging.info(f"Sent recovery feedback clear to game {data['game_code']}")
+        except:
+            logging.error("Failed to send recovery feedback clear message")
+
+
+# Socket event name -> handler(sid, data); connect and disconnect are wired separately
+SOCKET_HANDLERS = {
+    'join_game_room': handle_join_room,
+    'start_game': handle_start_game,
+    'show_feedback': handle_show_feedback,
+    'submit_answer': handle_submit_answer,
+    'broadcast_question': handle_broadcast_question,
+    'answer_result': handle_answer_result,
+    'grading_complete': handle_grading_complete,
+    'clear_feedback': handle_clear_feedback,
+}
+
+
+# Clean up disconnected games periodically
+def cleanup_inactive_games():
+    """Remove games that have been inactive for more than 2 hours"""
+    current_time = datetime.now()
+    games_to_remove = []
+
+    for game_code, game in active_games.items():
+        # If game has no activity timestamp or is more than 2 hours old
+        if 'last_activity' not in game or (current_time - game['last_activity']).total_seconds() > 7200:
+            games_to_remove.append(game_code)
+
+    for game_code in games_to_remove:
+        del active_games[game_code]
+        # Keep the game's final token bill in its event log once the live counters are dropped
+        event_log.append(game_code, 'game_expired', usage=metrics.forget_game(game_code))
+        logging.info(f"Removed inactive game {game_code}")
+
+
+def restore_games():
+    """Reload games from the last snapshot so reconnecting clients can resume."""
+    restored = snapshot_store.load()
+    now = datetime.now()
+    for game_code, game in restored.items():
+        if game_code in active_games:
+            continue
+        game['player_sockets'] = {}
+        game['current_timer'] = None
+        game.setdefault('last_activity', now)
+        active_games[game_code] = game
+
+        # Resume the answer timer with whatever time was left when we went down
+        if game.get('phase') == 'answering':
+            remaining = (game['timer_end'] - now).total_seconds() if game.get('timer_end') else 0
+            start_answer_timer(game_code, max(remaining, 1.0))
+
+    if restored:
+        logging.info(f"Restored {len(restored)} games from snapshot {SNAPSHOT_PATH}")
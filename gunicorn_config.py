@@ -26,6 +26,8 @@ raw_env = [
     "RUNNING_IN_PRODUCTION=true",
 ]
 
+# App factory; background services are started per worker in post_worker_init
+wsgi_app = "main:create_app()"
 preload_app = True
 reload = False
 
@@ -33,7 +35,10 @@ def on_starting(server):
     logging.info(f"Starting Gunicorn with {worker_class}")
 
 def post_worker_init(worker):
+    # Schedulers must start after fork, otherwise they only run in the master
+    from main import start_background_services
+    start_background_services()
     logging.info(f"Worker initialized with class: {worker.__class__.__name__}")
 
 def worker_abort(worker):
-    logging.error(f"Worker aborted: {worker.pid}")
\ No newline at end of file
+    logging.error(f"Worker aborted: {worker.pid}")
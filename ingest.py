@@ -0,0 +1,122 @@
+"""Bulk-ingest transcripts and questions for a list of videos ahead of class.
+
+Fetches each transcript (building its index) with bounded parallelism, then
+pre-generates questions for every interval window, grade level and question
+type the host UI can ask for, so live games are served from the local caches.
+Anything already cached is skipped.
+
+Usage:
+    python ingest.py URL [URL ...] [--file playlist.txt] [--intervals 1 2 3]
+                     [--grades 6 7] [--question-types 3] [--workers 4]
+"""
+import argparse
+import logging
+import math
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from dotenv import load_dotenv
+
+import content
+
+
+def read_urls(args):
+    urls = list(args.urls)
+    if args.file:
+        with open(args.file, encoding='utf-8') as f:
+            urls.extend(line.strip() for line in f if line.strip() and not line.startswith('#'))
+    return urls
+
+
+def question_windows(duration, interval_minutes):
+    """Mirror host.js: a question at every full interval mark covering the interval before it."""
+    interval_seconds = interval_minutes * 60
+    for mark in range(1, math.floor(duration / interval_seconds) + 1):
+        yield (mark - 1) * interval_seconds, mark * interval_seconds
+
+
+def run_parallel(jobs, workers, label):
+    """Run (description, fn) jobs on a bounded pool and report throughput."""
+    succeeded, failed = 0, 0
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(fn): description for description, fn in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as e:
+                result = None
+                logging.error(f"{label} failed for {futures[future]}: {str(e)}")
+            if result is None:
+                failed += 1
+            else:
+                succeeded += 1
+    elapsed = time.perf_counter() - start
+    rate = succeeded / elapsed if elapsed > 0 else 0.0
+    print(f"{label}: {succeeded} done, {failed} failed in {elapsed:.1f}s ({rate:.2f}/s)")
+    return succeeded, failed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('urls', nargs='*', help='YouTube video URLs')
+    parser.add_argument('--file', help='file with one video URL per line')
+    parser.add_argument('--intervals', type=int, nargs='+', default=[2],
+                        help='question intervals in minutes (host UI: 1-3)')
+    parser.add_argument('--grades', nargs='+', default=['6'], help='grade levels (1-12)')
+    parser.add_argument('--question-types', type=int, nargs='+', default=[3],
+                        help='question types (1 factual .. 5 deep thinking)')
+    parser.add_argument('--workers', type=int, default=4, help='maximum concurrent API calls')
+    args = parser.parse_args(argv)
+
+    load_dotenv()
+    logging.basicConfig(level=logging.WARNING)
+
+    video_ids = []
+    for url in read_urls(args):
+        video_id = content.extract_video_id(url)
+        if video_id:
+            if video_id not in video_ids:
+                video_ids.append(video_id)
+        else:
+            print(f"Skipping invalid YouTube URL: {url}", file=sys.stderr)
+    if not video_ids:
+        parser.error('no valid video URLs given')
+
+    overall_start = time.perf_counter()
+
+    to_fetch = [video_id for video_id in video_ids if not content.is_transcript_cached(video_id)]
+    print(f"Transcripts: {len(video_ids) - len(to_fetch)} cached, {len(to_fetch)} to fetch")
+    run_parallel([(video_id, lambda video_id=video_id: content.get_transcript_index(video_id))
+                  for video_id in to_fetch], args.workers, 'Transcripts')
+
+    jobs = []
+    skipped = 0
+    for video_id in video_ids:
+        # Don't retry transcripts that just failed to fetch
+        if not content.is_transcript_cached(video_id):
+            continue
+        index = content.get_transcript_index(video_id)
+        for interval in args.intervals:
+            for start_time, end_time in question_windows(index.duration, interval):
+                if not index.segment(start_time, end_time):
+                    continue
+                for grade_level in args.grades:
+                    for question_type in args.question_types:
+                        params = (video_id, start_time, end_time, question_type, grade_level)
+                        if content.get_cached_question(*params) is not None:
+                            skipped += 1
+                            continue
+                        jobs.append((f"{video_id} {start_time}-{end_time}s type {question_type} grade {grade_level}",
+                                     lambda params=params: content.generate_question(*params)))
+
+    print(f"Questions: {skipped} cached, {len(jobs)} to generate")
+    _, failed = run_parallel(jobs, args.workers, 'Questions')
+
+    print(f"Finished in {time.perf_counter() - overall_start:.1f}s")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,135 @@
+import random
+
+
+class _Node:
+    __slots__ = ('key', 'player_id', 'priority', 'size', 'left', 'right')
+
+    def __init__(self, key, player_id):
+        self.key = key
+        self.player_id = player_id
+        self.priority = random.random()
+        self.size = 1
+        self.left = None
+        self.right = None
+
+
+def _size(node):
+    return node.size if node else 0
+
+
+def _update(node):
+    node.size = 1 + _size(node.left) + _size(node.right)
+
+
+def _split(node, key):
+    """Split into (keys < key, keys >= key)."""
+    if node is None:
+        return None, None
+    if node.key < key:
+        left, right = _split(node.right, key)
+        node.right = left
+        _update(node)
+        return node, right
+    left, right = _split(node.left, key)
+    node.left = right
+    _update(node)
+    return left, node
+
+
+def _merge(left, right):
+    """Merge two treaps where every key in left is smaller than every key in right."""
+    if left is None:
+        return right
+    if right is None:
+        return left
+    if left.priority > right.priority:
+        left.right = _merge(left.right, right)
+        _update(left)
+        return left
+    right.left = _merge(left, right.left)
+    _update(right)
+    return right
+
+
+class Leaderboard:
+    """Per-game ranking kept in a size-augmented treap.
+
+    Players are ordered by score (highest first), then by join order. Score
+    updates, rank lookups and top-K queries are O(log n + k).
+    """
+
+    def __init__(self):
+        self._root = None
+        self._keys = {}  # player_id -> (-score, join order, player_id)
+
+    @classmethod
+    def from_players(cls, players):
+        """Build from a game's players dict ({player_id: {'score': ...}})."""
+        leaderboard = cls()
+        for player_id, player in players.items():
+            leaderboard.set_score(player_id, player.get('score', 0))
+        return leaderboard
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, player_id):
+        return player_id in self._keys
+
+    @staticmethod
+    def _join_order(player_id):
+        return int(player_id) if str(player_id).isdigit() else float('inf')
+
+    def _remove_key(self, key):
+        left, rest = _split(self._root, key)
+        _, right = _split(rest, (key[0], key[1], key[2] + '\0'))
+        self._root = _merge(left, right)
+
+    def set_score(self, player_id, score):
+        key = self._keys.get(player_id)
+        if key is not None:
+            if key[0] == -score:
+                return
+            self._remove_key(key)
+
+        key = (-score, self._join_order(player_id), player_id)
+        self._keys[player_id] = key
+        left, right = _split(self._root, key)
+        self._root = _merge(_merge(left, _Node(key, player_id)), right)
+
+    def remove(self, player_id):
+        key = self._keys.pop(player_id, None)
+        if key is not None:
+            self._remove_key(key)
+
+    def score(self, player_id):
+        key = self._keys.get(player_id)
+        return -key[0] if key is not None else 0
+
+    def rank(self, player_id):
+        """1-based rank; players tied on score share a rank. None if unknown."""
+        key = self._keys.get(player_id)
+        if key is None:
+            return None
+
+        # Count players with a strictly higher score
+        node, ahead = self._root, 0
+        while node is not None:
+            if node.key[0] < key[0]:
+                ahead += _size(node.left) + 1
+                node = node.right
+            else:
+                node = node.left
+        return ahead + 1
+
+    def top(self, k):
+        """The k best players as [(player_id, score)], best first."""
+        result, stack, node = [], [], self._root
+        while (stack or node is not None) and len(result) < k:
+            while node is not None:
+                stack.append(node)
+                node = node.left
+            node = stack.pop()
+            result.append((node.player_id, -node.key[0]))
+            node = node.right
+        return result
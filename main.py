@@ -1,167 +1,80 @@
 import eventlet
 eventlet.monkey_patch()
+from eventlet import tpool
 
+import atexit
 import os
-import requests
+import signal
 
-from flask import Flask, request, jsonify, render_template, send_file
+from flask import Blueprint, Flask, Response, g, request, jsonify, render_template, send_file
 from flask_cors import CORS
-from openai import OpenAI
 import logging
-from pydantic import BaseModel
-from typing import List
 from dotenv import load_dotenv
-import re
-import random
-import string
-from flask_socketio import SocketIO, emit, join_room, leave_room
+from flask_socketio import SocketIO
 import threading
-from datetime import datetime, timedelta
-import qrcode
-from io import BytesIO
-import base64
 
+# Local modules read their settings from the environment at import
 load_dotenv()
+
+# openai, pydantic, qrcode and requests are imported on first use (or by
+# providers.warm_up) so importing this module stays cheap for preload_app.
+import assets
+import content
+import game
+import metrics
+import profiling
+from eventlog import EXPORT_FORMATS
+from content import extract_video_id, get_transcript_segment
+from game import active_games, event_log, snapshot_store
+from providers import warm_up
+from qrcodes import qr_code_data_uri
+
 logging.basicConfig(level=logging.DEBUG)
 
-# Initialize OpenAI client
-openai_api_key = os.environ.get("OPENAI_API_KEY")
-if not openai_api_key:
-    logging.warning("OPENAI_API_KEY not found in environment variables")
-client = OpenAI(api_key=openai_api_key)
-
-app = Flask(__name__)
-app.secret_key = os.environ.get("SESSION_SECRET")
-CORS(app)
-
-# Configure SocketIO with eventlet
-socketio = SocketIO(
-    app,
-    cors_allowed_origins="*",
-    async_mode='eventlet',
-    logger=True,
-    engineio_logger=True,
-    ping_timeout=60,
-    ping_interval=25,
-    manage_session=False
-)
-
-# Store active games in memory
-active_games = {}  # Add feedback_shown flag when creating new game
-
-class ReflectionClosedQuestion(BaseModel):
-    question: str
-    correct_answer: str
-    incorrect_answers: List[str]
-
-class ReflectionClosedPromptResponse(BaseModel):
-    reflection_prompt: ReflectionClosedQuestion
-
-class ReflectionSingleQuestion(BaseModel):
-    is_correct: bool
-    explanation: str
-
-class RefectionSinglePromptResponse(BaseModel):
-    reflection_prompt: ReflectionSingleQuestion
-
-def generate_game_code():
-    return ''.join(random.choices(string.ascii_uppercase + string.digits, k=6))
-
-def extract_video_id(url):
-    patterns = [
-        r'(?:youtube\.com\/watch\?v=|youtu.be\/)([^&\n?]*)',
-        r'youtube.com\/embed\/([^&\n?]*)',
-    ]
-
-    for pattern in patterns:
-        match = re.search(pattern, url)
-        if match:
-            return match.group(1)
-    return None
-
-def get_transcript_segment(video_id, start_time, end_time):
-    try:
-        # Log the attempt
-        logging.info(f"Attempting to get transcript for video {video_id} from {start_time}s to {end_time}s")
+bp = Blueprint('main', __name__)
+
+# SocketIO is bound to the app in create_app(); handlers below register on it
+socketio = SocketIO()
+
+
+class EventletTransport:
+    """game.py's view of Flask-SocketIO; timers are green threads under monkey_patch."""
+
+    def emit(self, event, payload, room):
+        socketio.emit(event, payload, room=room)
 
-        # Try Supadata API as the primary method
-        transcript = None
+    def enter_room(self, sid, room):
+        socketio.server.enter_room(sid, room, namespace='/')
+
+    def room_size(self, room):
         try:
-            logging.info("Attempting Supadata API transcript retrieval")
-            supadata_api_key = os.environ.get("SUPADATA_API_KEY")
-
-            if not supadata_api_key:
-                logging.warning("Supadata API key not found in environment variables")
-                return None
-
-            # Make request to Supadata API
-            supadata_url = "https://api.supadata.ai/v1/youtube/transcript"
-            headers = {
-                "X-API-Key": supadata_api_key,
-                "Content-Type": "application/json"
-            }
-            params = {
-                "videoId": video_id
-            }
-
-            response = requests.get(supadata_url, headers=headers, params=params)
-
-            if response.status_code == 200:
-                # Parse Supadata response
-                supadata_data = response.json()
-                logging.info(f"Supadata API response keys: {supadata_data.keys()}")
-
-                # Check if the response has the 'content' field as shown in the error message
-                if "content" in supadata_data:
-                    transcript = []
-                    for item in supadata_data["content"]:
-                        transcript.append({
-                            "text": item.get("text", ""),
-                            "start": item.get("offset", 0) / 1000,  # Convert milliseconds to seconds
-                            "duration": item.get("duration", 0) / 1000  # Convert milliseconds to seconds
-                        })
-                    logging.info("Supadata API transcript retrieval successful")
-                else:
-                    logging.warning(f"Unexpected Supadata API response format: {supadata_data}")
-                    return None
-            else:
-                logging.warning(f"Supadata API error: {response.status_code}, {response.text}")
-                return None
-        except Exception as e:
-            logging.error(f"Supadata API failed: {str(e)}")
-            return None
-
-        if transcript is None:
-            logging.error(f"Could not retrieve transcript for video {video_id}")
-            return None
-
-        relevant_text = []
-
-        for entry in transcript:
-            if start_time <= entry['start'] <= end_time:
-                relevant_text.append(entry['text'])
-
-        result = ' '.join(relevant_text)
-        logging.info(f"Successfully retrieved transcript segment for video {video_id} from {start_time}s to {end_time}s")
-        return result
-    except Exception as e:
-        logging.error(f"Unexpected error getting transcript for video {video_id}: {str(e)}")
-        return None
+            return sum(1 for _ in socketio.server.manager.get_participants('/', room))
+        except KeyError:
+            return 0
+
+    def call_later(self, delay, callback):
+        timer = threading.Timer(delay, callback)
+        timer.daemon = True  # Make timer a daemon thread so it doesn't block program exit
+        timer.start()
+        return timer
 
-@app.route("/")
+
+game.set_transport(EventletTransport())
+
+@bp.route("/")
 def index():
     return render_template("index.html")
 
-@app.route("/host")
+@bp.route("/host")
 def host():
     return render_template("host.html")
 
-@app.route("/join")
+@bp.route("/join")
 def join():
     return render_template("join.html")
 
 # New route for generating QR codes on the server side
-@app.route("/api/generate_qr", methods=["POST"])
+@bp.route("/api/generate_qr", methods=["POST"])
 def generate_qr():
     try:
         data = request.json.get("data", "")
@@ -170,33 +83,141 @@ def generate_qr():
 
         logging.info(f"Generating QR code for: {data}")
 
-        # Create QR code
-        qr = qrcode.QRCode(
-            version=1,
-            error_correction=qrcode.constants.ERROR_CORRECT_H,
-            box_size=10,
-            border=4,
-        )
-        qr.add_data(data)
-        qr.make(fit=True)
-
-        # Create an image from the QR Code
-        img = qr.make_image(fill_color="black", back_color="white")
-
-        # Convert image to bytes
-        buffered = BytesIO()
-        img.save(buffered, format="PNG")
-        img_str = base64.b64encode(buffered.getvalue()).decode()
-
         return jsonify({
             "success": True,
-            "qr_code": f"data:image/png;base64,{img_str}"
+            "qr_code": qr_code_data_uri(data)
         })
     except Exception as e:
         logging.error(f"Error generating QR code: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route("/api/create_game", methods=["POST"])
+@bp.route("/api/metrics")
+def get_metrics():
+    return jsonify(metrics.snapshot())
+
+# Game usage, the event export and the profiling routes need the admin token
+def _admin_error_response():
+    error = profiling.admin_error(request.headers.get(profiling.ADMIN_TOKEN_HEADER))
+    if error is None:
+        return None
+    message, status = error
+    return jsonify({"success": False, "error": message}), status
+
+@bp.route("/admin/usage")
+def get_top_game_usage():
+    """Token usage and estimated OpenAI cost of the most expensive games."""
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    return jsonify({"success": True, "top_games": metrics.top_game_usage()})
+
+@bp.route("/api/games/<game_code>/usage")
+def get_game_usage(game_code):
+    """Token usage and estimated OpenAI cost for one game."""
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    return jsonify({"success": True, "game_code": game_code, "usage": metrics.game_usage(game_code)})
+
+@bp.route("/api/games/<game_code>/export")
+def export_game_events(game_code):
+    """Stream a game's event log as gzip-compressed CSV or JSONL."""
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    fmt = request.args.get("format", "csv")
+    if fmt not in EXPORT_FORMATS:
+        return jsonify({"success": False, "error": f"Unsupported format: {fmt}"}), 400
+
+    # Make sure events still sitting in the buffer are part of the export
+    flush_event_log()
+    if not event_log.segments(game_code):
+        return jsonify({"success": False, "error": "No events recorded for this game"}), 404
+
+    return Response(
+        event_log.export(game_code, fmt),
+        mimetype="application/gzip",
+        headers={"Content-Disposition": f"attachment; filename={game_code}-events.{fmt}.gz"}
+    )
+
+# Admin-only profiling surface; see profiling.py
+@bp.route("/admin/profile/sample", methods=["POST"])
+def profile_sample():
+    """Sample every thread for a few seconds and return collapsed stacks for a flame graph."""
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    try:
+        data = request.get_json(silent=True) or {}
+        seconds = profiling.clamp_seconds(data.get("seconds", 10))
+        interval_ms = float(data.get("interval_ms", profiling.SAMPLE_INTERVAL_MS))
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    sampler = profiling.SamplingProfiler(interval_ms / 1000).start()
+    socketio.sleep(seconds)
+    collapsed = sampler.stop()
+    return Response(collapsed, mimetype="text/plain", headers={"X-Samples": str(sampler.samples)})
+
+@bp.route("/admin/profile/calls", methods=["POST"])
+def profile_calls_arm():
+    """cProfile the next `count` calls of a REST path (e.g. /api/check_answer) or socket event."""
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    data = request.get_json(silent=True) or {}
+    target = data.get("target")
+    if not target:
+        return jsonify({"success": False, "error": "No target provided"}), 400
+    try:
+        count = int(data.get("count", 1))
+    except (TypeError, ValueError) as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+    profiling.call_profiler.arm(target, count)
+    return jsonify({"success": True, **profiling.call_profiler.status(target)})
+
+@bp.route("/admin/profile/calls", methods=["GET"])
+def profile_calls_report():
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    target = request.args.get("target", "")
+    fmt = request.args.get("format", "text")
+    report = profiling.call_profiler.report(target, fmt)
+    if report is None:
+        return jsonify({"success": False, "error": f"No profiled calls for {target}",
+                        "status": profiling.call_profiler.status(target)}), 404
+    if fmt == "prof":
+        return Response(report, mimetype="application/octet-stream",
+                        headers={"Content-Disposition": "attachment; filename=calls.prof"})
+    return Response(report, mimetype="text/plain")
+
+@bp.route("/admin/profile/calls", methods=["DELETE"])
+def profile_calls_disarm():
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    return jsonify({"success": profiling.call_profiler.disarm(request.args.get("target", ""))})
+
+@bp.route("/admin/stalls")
+def get_stalls():
+    """Recent event-loop stalls and the stack each was caught in."""
+    denied = _admin_error_response()
+    if denied:
+        return denied
+    return jsonify({"success": True, **profiling.stall_detector.snapshot()})
+
+@bp.before_app_request
+def start_request_profile():
+    g.request_profile = profiling.call_profiler.start(request.path)
+
+@bp.teardown_app_request
+def finish_request_profile(exc):
+    profile = g.pop('request_profile', None)
+    if profile is not None:
+        profiling.call_profiler.finish(request.path, profile)
+
+@bp.route("/api/create_game", methods=["POST"])
 def create_game():
     try:
         url = request.json["url"]
@@ -219,26 +240,7 @@ def create_game():
                 "error": "Could not access video subtitles. The video might not have subtitles enabled, or they might be restricted. Try another video or ensure the video has captions available."
             }), 400
 
-        game_code = generate_game_code()
-        while game_code in active_games:
-            game_code = generate_game_code()
-
-        active_games[game_code] = {
-            'video_id': video_id,
-            'host_id': None,
-            'players': {},
-            'player_sockets': {},
-            'current_question': None,
-            'phase': 'lobby',
-            'feedback_shown': False,
-            'submitted_answers': [],
-            'last_activity': datetime.now(),
-            'settings': {
-                'question_interval': question_interval,
-                'question_type': question_type,
-                'difficulty': grade_level
-            }
-        }
+        game_code = game.create_game(video_id, question_interval, question_type, grade_level)
 
         logging.info(f"Successfully created game with code: {game_code}")
         return jsonify({
@@ -253,7 +255,7 @@ def create_game():
             "error": f"Could not create game. Error: {str(e)}"
         }), 400
 
-@app.route("/api/join_game", methods=["POST"])
+@bp.route("/api/join_game", methods=["POST"])
 def join_game():
     try:
         game_code = request.json["game_code"]
@@ -263,33 +265,7 @@ def join_game():
             logging.warning(f"Attempt to join non-existent game: {game_code}")
             return jsonify({"success": False, "error": "Invalid game code"}), 400
 
-        # Generate a unique player ID with more resilience
-        # Get the highest existing player ID and add 1
-        existing_ids = [int(pid) for pid in active_games[game_code]['players'].keys() if pid.isdigit()]
-        next_id = 1 if not existing_ids else max(existing_ids) + 1
-        player_id = str(next_id)
-        
-        # Store player in game
-        active_games[game_code]['players'][player_id] = {
-            'nickname': nickname,
-            'score': 0,
-            'join_time': datetime.now().isoformat()
-        }
-        
-        # Initialize player_sockets if it doesn't exist
-        if 'player_sockets' not in active_games[game_code]:
-            active_games[game_code]['player_sockets'] = {}
-            
-        # Update last activity timestamp
-        active_games[game_code]['last_activity'] = datetime.now()
-
-        logging.info(f"Player {player_id} ({nickname}) joined game {game_code}")
-
-        # Notify all clients in the room about the new player
-        socketio.emit('player_joined', {
-            'nickname': nickname,
-            'player_id': player_id
-        }, room=game_code)
+        player_id = game.add_player(game_code, nickname)
 
         return jsonify({
             "success": True,
@@ -300,7 +276,7 @@ def join_game():
         logging.error(f"Error joining game: {str(e)}")
         return jsonify({"success": False, "error": f"Could not join game: {str(e)}"}), 500
 
-@app.route("/api/generate_question", methods=["POST"])
+@bp.route("/api/generate_question", methods=["POST"])
 def generate_question():
     try:
         video_id = request.json["video_id"]
@@ -308,100 +284,32 @@ def generate_question():
         end_time = request.json.get("end_time", start_time + 60)
         question_type = request.json.get("question_type", 3)  # Default: 3 (balanced)
         grade_level = request.json.get("difficulty", "6")
+        game_code = request.json.get("game_code")
 
-        content_segment = get_transcript_segment(video_id, start_time, end_time)
-        if not content_segment:
+        question = content.generate_question(video_id, start_time, end_time, question_type, grade_level,
+                                             game_code=game_code)
+        if not question:
             return jsonify({"success": False, "error": "Could not get video transcript"}), 400
 
-        # Create a question type prompt based on the slider value (1-5)
-        question_style_prompt = ""
-        if question_type == 1:
-            question_style_prompt = "Create very specific, factual multiple-choice questions that directly test recall of information presented in the content. Focus on names, dates, and explicit facts mentioned."
-        elif question_type == 2:
-            question_style_prompt = "Create factual multiple-choice questions that test basic comprehension of the main points in the content."
-        elif question_type == 3:
-            question_style_prompt = "Create balanced multiple-choice questions that test both recall of facts and understanding of concepts from the content."
-        elif question_type == 4:
-            question_style_prompt = "Create analytical multiple-choice questions that require deeper understanding and application of concepts from the content."
-        else:  # question_type == 5
-            question_style_prompt = "Create deep thinking multiple-choice questions that challenge students to evaluate, synthesize or apply the content in new contexts. These should require critical thinking beyond just recalling information."
-
-        grade_prompt = f"Create questions suitable for {grade_level}th grade students. " if grade_level != "1" else "Create questions suitable for 1st grade students. "
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are an expert in creating multiple-choice questions. {grade_prompt}{question_style_prompt}"
-                },
-                {
-                    "role": "user",
-                    "content": f"Generate a multiple-choice question based on this content: {content_segment}"
-                }
-            ],
-            functions=[{
-                "name": "generate_reflection_prompt",
-                "parameters": ReflectionClosedPromptResponse.schema()
-            }],
-            function_call={"name": "generate_reflection_prompt"}
-        )
-
-        reflection_prompt = ReflectionClosedPromptResponse.model_validate_json(
-            completion.choices[0].message.function_call.arguments
-        )
-
-        return jsonify({
-            "success": True,
-            "reflective_question": reflection_prompt.reflection_prompt.question,
-            "correct_answer": reflection_prompt.reflection_prompt.correct_answer,
-            "incorrect_answers": reflection_prompt.reflection_prompt.incorrect_answers,
-            "content_segment": content_segment
-        })
+        return jsonify({"success": True, **question})
 
     except Exception as e:
         logging.error(f"Error generating question: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-@app.route("/api/check_answer", methods=["POST"])
+@bp.route("/api/check_answer", methods=["POST"])
 def check_answer():
     try:
         content_segment = request.json.get("content_segment")
         question = request.json.get("question")
         answers = request.json.get("answers", [])
+        game_code = request.json.get("game_code")
+        video_id = active_games.get(game_code, {}).get('video_id')
 
         results = []
         for answer_data in answers:
-            completion = client.chat.completions.create(
-                model="gpt-4o",
-                messages=[
-                    {
-                        "role": "system",
-                        "content": "You are an expert in validating student answers.",
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Context: {content_segment}\nQuestion: {question}\nPlease check if this answer is somewhat correct: {answer_data['answer']}. Be lenient - even close or short answers are fine. If incorrect, please explain why.",
-                    },
-                ],
-                functions=[
-                    {
-                        "name": "generate_reflection_prompt",
-                        "parameters": RefectionSinglePromptResponse.model_json_schema(),
-                    }
-                ],
-                function_call={"name": "generate_reflection_prompt"},
-            )
-
-            reflection_prompt = RefectionSinglePromptResponse.model_validate_json(
-                completion.choices[0].message.function_call.arguments
-            )
-
-            results.append({
-                "player_id": answer_data["player_id"],
-                "answer": answer_data["answer"],
-                "is_correct": reflection_prompt.reflection_prompt.is_correct,
-                "explanation": reflection_prompt.reflection_prompt.explanation,
-            })
+            results.append(content.check_answer(content_segment, question, answer_data,
+                                                game_code=game_code, video_id=video_id))
 
         return jsonify({
             "success": True,
@@ -413,33 +321,20 @@ def check_answer():
 
 # Add the translation endpoint after line 314 (after the check_answer route)
 
-@app.route("/api/translate", methods=["POST"])
+@bp.route("/api/translate", methods=["POST"])
 def translate_text():
     try:
         text = request.json.get("text")
         target_language = request.json.get("target_language", "hebrew")
+        game_code = request.json.get("game_code")
 
         if not text:
             return jsonify({"success": False, "error": "No text provided"}), 400
 
         logging.info(f"Translation request received for text: {text[:50]}... to {target_language}")
 
-        # Use OpenAI to translate the text
-        completion = client.chat.completions.create(
-            model="gpt-4o",
-            messages=[
-                {
-                    "role": "system",
-                    "content": f"You are a professional translator. Translate the following text to {target_language}. Keep any special formatting and HTML intact. Only translate the actual text content."
-                },
-                {
-                    "role": "user",
-                    "content": text
-                }
-            ]
-        )
-
-        translated_text = completion.choices[0].message.content
+        translated_text = content.translate(text, target_language, game_code=game_code,
+                                            video_id=active_games.get(game_code, {}).get('video_id'))
         logging.info(f"Translation successful. Result: {translated_text[:50]}...")
 
         return jsonify({
@@ -451,389 +346,145 @@ def translate_text():
         logging.error(f"Error translating text: {str(e)}")
         return jsonify({"success": False, "error": str(e)}), 500
 
-# Socket.IO event handlers
-def start_answer_timer(game_code):
-    """Start a timer for the current question. After 60 seconds, trigger feedback."""
-    def timer_callback():
-        try:
-            if game_code in active_games and active_games[game_code]['phase'] == 'answering':
-                logging.info(f"Timer expired for game {game_code}. Automatically showing feedback.")
-                handle_show_feedback({'game_code': game_code})
-            else:
-                logging.info(f"Timer expired for game {game_code}, but game is no longer in answering phase.")
-        except Exception as e:
-            logging.error(f"Error in timer callback for game {game_code}: {str(e)}")
-
-    # Cancel any existing timer first to prevent overlaps
-    if game_code in active_games and 'current_timer' in active_games[game_code] and active_games[game_code]['current_timer']:
-        try:
-            active_games[game_code]['current_timer'].cancel()
-            logging.info(f"Cancelled existing timer for game {game_code}")
-        except:
-            logging.warning(f"Failed to cancel existing timer for game {game_code}")
-
-    # Create and store the new timer
-    timer = threading.Timer(60.0, timer_callback)
-    timer.daemon = True  # Make timer a daemon thread so it doesn't block program exit
-    timer.start()
-
-    # Store timer and end time in game state
-    active_games[game_code]['current_timer'] = timer
-    active_games[game_code]['timer_end'] = datetime.now() + timedelta(seconds=60)
-    active_games[game_code]['answers_timer_started'] = True
-    
-    logging.info(f"Started 60-second answer timer for game {game_code}")
-
+# Socket.IO events are handled in game.py, shared with the asyncio server
 @socketio.on('connect')
 def handle_connect():
-    logging.info(f'Client connected: {request.sid}')
+    game.handle_connect(request.sid)
 
 @socketio.on('disconnect')
 def handle_disconnect():
-    """Handle client disconnection."""
-    logging.info(f'Client disconnected: {request.sid}')
-
-    # Try to recover disconnected players
-    for game_code, game in active_games.items():
-        # Check if this socket is in this game
-        for player_id, player_data in game.get('player_sockets', {}).items():
-            if player_data.get('socket_id') == request.sid:
-                logging.info(f'Player {player_id} disconnected from game {game_code}')
-                # Don't remove the player immediately, allow reconnection
-                player_data['connected'] = False
-                player_data['last_seen'] = datetime.now()
-                # Notify other players
-                emit('player_disconnected', {
-                    'player_id': player_id,
-                    'nickname': game['players'][player_id]['nickname']
-                }, room=game_code)
-                break
-
-@socketio.on('join_game_room')
-def handle_join_room(data):
-    game_code = data['game_code']
-    player_id = data.get('player_id')
-    is_host = data.get('is_host', False)
-
-    logging.info(f'Socket {request.sid} attempting to join game room {game_code} - Player ID: {player_id}, Is Host: {is_host}')
-    
-    if game_code not in active_games:
-        logging.warning(f'Attempt to join non-existent game: {game_code}')
-        emit('join_error', {'error': 'Game does not exist'})
-        return
+    game.handle_disconnect(request.sid)
 
-    # Join the socket to the game's room
-    join_room(game_code)
-    logging.info(f'Socket {request.sid} joined room {game_code}')
-
-    # Initialize player_sockets dictionary if it doesn't exist
-    if 'player_sockets' not in active_games[game_code]:
-        active_games[game_code]['player_sockets'] = {}
-
-    # Update last activity timestamp
-    active_games[game_code]['last_activity'] = datetime.now()
-
-    # If this is the host
-    if is_host:
-        logging.info(f'Host connected to game {game_code} with socket {request.sid}')
-        active_games[game_code]['host_socket_id'] = request.sid
-        
-        # Send current game state to the host
-        emit('game_state_update', {
-            'state': active_games[game_code].get('phase', 'lobby'),
-            'players': [{'id': pid, 'nickname': p['nickname'], 'score': p.get('score', 0)} 
-                       for pid, p in active_games[game_code]['players'].items()],
-            'current_question': active_games[game_code].get('current_question')
-        })
-    
-    # If this is a player (not just a spectator/host)
-    elif player_id and player_id in active_games[game_code]['players']:
-        player_nickname = active_games[game_code]['players'][player_id]['nickname']
-        logging.info(f'Player {player_id} ({player_nickname}) connected with socket {request.sid} in game {game_code}')
-        
-        # Track this socket for the player
-        active_games[game_code]['player_sockets'][player_id] = {
-            'socket_id': request.sid,
-            'connected': True,
-            'last_seen': datetime.now()
-        }
-
-        # If this was a reconnection, update status and notify everyone
-        emit('player_reconnected', {
-            'player_id': player_id,
-            'nickname': player_nickname
-        }, room=game_code)
-        
-        # Send current game state to the reconnecting player
-        game_state = active_games[game_code].get('phase', 'lobby')
-        current_question = active_games[game_code].get('current_question', None)
-        
-        emit('game_state_update', {
-            'state': game_state,
-            'question': current_question,
-            'scores': {pid: p.get('score', 0) for pid, p in active_games[game_code]['players'].items()}
-        })
-        
-        # If game is in progress, send the current question
-        if game_state == 'answering' and current_question:
-            emit('new_question', current_question)
-        elif game_state == 'feedback' and 'feedback_data' in active_games[game_code]:
-            emit('answer_results', active_games[game_code]['feedback_data'])
-
-    # Confirm room join to the client that just connected
-    emit('room_joined', {'game_code': game_code})
-
-@socketio.on('start_game')
-def handle_start_game(data):
-    game_code = data['game_code']
-    # Capture the question settings if provided
-    question_interval = data.get('question_interval')
-    question_type = data.get('question_type')
-
-    if game_code in active_games:
-        active_games[game_code]['phase'] = 'playing'
-
-        # Update settings if provided
-        if question_interval is not None:
-            active_games[game_code]['settings']['question_interval'] = question_interval
-        if question_type is not None:
-            active_games[game_code]['settings']['question_type'] = question_type
-
-        emit('game_started', {}, room=game_code)
-
-@socketio.on('show_feedback')
-def handle_show_feedback(data):
-    """Handle manual triggering of feedback stage."""
-    try:
-        game_code = data['game_code']
-        if game_code not in active_games:
-            logging.warning(f"Show feedback called for non-existent game: {game_code}")
-            return
+def _bind_socket_handler(event, handler):
+    return lambda data: profiling.call_profiler.call(event, handler, request.sid, data)
+
+for _event, _handler in game.SOCKET_HANDLERS.items():
+    socketio.on_event(_event, _bind_socket_handler(_event, _handler))
 
-        # Make sure we don't process feedback twice
-        if active_games[game_code].get('feedback_shown', False) and active_games[game_code]['phase'] == 'feedback':
-            logging.info(f"Game {game_code}: Feedback already shown, ignoring duplicate request")
+# Schedule cleanup every hour
+def schedule_cleanup():
+    game.cleanup_inactive_games()
+    threading.Timer(3600, schedule_cleanup).start()
+
+def save_snapshot(blocking=False):
+    """Encode and write changed games to the snapshot file, off the event loop unless blocking."""
+    try:
+        batch = snapshot_store.collect(active_games)
+        if batch is None:
             return
-            
-        logging.info(f"Game {game_code}: Processing feedback request")
-        
-        # Cancel timer if it exists
-        if 'current_timer' in active_games[game_code] and active_games[game_code]['current_timer']:
-            try:
-                active_games[game_code]['current_timer'].cancel()
-                logging.info(f"Game {game_code}: Cancelled answer timer")
-            except:
-                logging.warning(f"Game {game_code}: Failed to cancel timer")
-            active_games[game_code]['current_timer'] = None
-
-        # Change phase to feedback and set feedback flag
-        active_games[game_code]['phase'] = 'feedback'
-        active_games[game_code]['feedback_shown'] = True
-        
-        # Prepare the answers - ensure we have a valid list even if none were submitted
-        if 'submitted_answers' not in active_games[game_code]:
-            active_games[game_code]['submitted_answers'] = []
-            
-        submitted_answers = active_games[game_code]['submitted_answers']
-        
-        # Log details for debugging
-        player_count = len(active_games[game_code]['players'])
-        answer_count = len(submitted_answers)
-        logging.info(f"Game {game_code}: Showing feedback for {answer_count}/{player_count} players who submitted answers")
-        
-        # Create a detailed log of which players submitted answers
-        if answer_count > 0:
-            player_names = [ans['nickname'] for ans in submitted_answers]
-            logging.info(f"Game {game_code}: Answers from: {', '.join(player_names)}")
-        
-        # Emit feedback event with current answers to all players
-        emit('show_feedback', {
-            'answers': submitted_answers
-        }, room=game_code)
-        
-        logging.info(f"Game {game_code}: Feedback show event emitted successfully")
+        if blocking:
+            snapshot_store.save(batch)
+        else:
+            tpool.execute(snapshot_store.save, batch)
     except Exception as e:
-        logging.error(f"Error handling show_feedback: {str(e)}")
-        # Try to recover if possible by sending a basic response
-        try:
-            if 'game_code' in data and data['game_code'] in active_games:
-                emit('show_feedback', {'answers': []}, room=data['game_code'])
-                logging.info(f"Sent recovery feedback response to game {data['game_code']}")
-        except:
-            logging.error("Failed to send recovery feedback response")
-
-@socketio.on('submit_answer')
-def handle_submit_answer(data):
-    game_code = data['game_code']
-    player_id = data['player_id']
-    answer = data['answer']
-
-    logging.info(f"Player {player_id} submitting answer in game {game_code}")
-
-    if game_code in active_games and player_id in active_games[game_code]['players']:
-        # Check if feedback has been shown for the current question
-        if active_games[game_code].get('feedback_shown', False):
-            logging.info(f"Answer rejected - feedback already shown for game {game_code}")
-            emit('answer_rejected', {
-                'reason': 'Feedback has already been shown'
-            }, room=request.sid)
-            return
+        logging.error(f"Error writing game snapshot: {str(e)}")
 
-        # Store the answer
-        if 'submitted_answers' not in active_games[game_code]:
-            active_games[game_code]['submitted_answers'] = []
-
-        # Check if player already submitted an answer
-        existing_answer_index = None
-        for i, existing_answer in enumerate(active_games[game_code]['submitted_answers']):
-            if existing_answer['player_id'] == player_id:
-                existing_answer_index = i
-                break
-
-        if existing_answer_index is not None:
-            # Update existing answer
-            active_games[game_code]['submitted_answers'][existing_answer_index]['answer'] = answer
-            logging.info(f"Updated answer for player {player_id} in game {game_code}")
-        else:
-            # Add new answer
-            active_games[game_code]['submitted_answers'].append({
-                'player_id': player_id,
-                'nickname': active_games[game_code]['players'][player_id]['nickname'],
-                'answer': answer
-            })
-            logging.info(f"Added new answer for player {player_id} in game {game_code}")
-
-        # Emit answer submitted event to all players
-        emit('answer_submitted', {
-            'player_id': player_id,
-            'nickname': active_games[game_code]['players'][player_id]['nickname'],
-            'answer': answer
-        }, room=game_code)
-
-        # Update remaining time for all players
-        if 'timer_end' in active_games[game_code]:
-            remaining_time = (active_games[game_code]['timer_end'] - datetime.now()).total_seconds()
-            emit('timer_update', {'remaining_time': max(0, remaining_time)}, room=game_code)
-
-@socketio.on('broadcast_question')
-def handle_broadcast_question(data):
-    game_code = data['game_code']
-    question_data = data['question']
-
-    if game_code in active_games:
-        logging.info(f"Broadcasting new question in game {game_code}")
-
-        # Reset submitted answers and feedback flag
-        active_games[game_code]['submitted_answers'] = []
-        active_games[game_code]['phase'] = 'answering'
-        active_games[game_code]['current_question'] = question_data
-        active_games[game_code]['feedback_shown'] = False  # Reset feedback flag
-
-        # Start the timer
-        start_answer_timer(game_code)
-
-        # Emit the new question with timer information
-        emit('new_question', {
-            **question_data,
-            'timer_duration': 60
-        }, room=game_code)
-
-        logging.info(f"Question broadcast complete for game {game_code}")
-
-@socketio.on('answer_result')
-def handle_answer_result(data):
-    game_code = data['game_code']
-    player_id = data['player_id']
-    is_correct = data['is_correct']
-
-    if game_code in active_games and player_id in active_games[game_code]['players']:
-        if is_correct:
-            active_games[game_code]['players'][player_id]['score'] += 100
-
-        emit('answer_result', {
-            'player_id': player_id,
-            'is_correct': is_correct
-        }, room=game_code)
-
-
-# Add socket handler for clearing feedback
-@socketio.on('clear_feedback')
-def handle_clear_feedback(data):
-    """Handle clearing of feedback when host continues the video."""
+def flush_event_log(blocking=False):
+    """Append buffered game events to their segment files, off the event loop unless blocking."""
     try:
-        game_code = data['game_code']
-        if game_code not in active_games:
-            logging.warning(f"Clear feedback called for non-existent game: {game_code}")
+        batch = event_log.take_pending()
+        if not batch:
             return
-            
-        logging.info(f"Game {game_code}: Processing clear feedback request")
-        
-        # Reset all question and feedback-related state
-        active_games[game_code]['feedback_shown'] = False
-        active_games[game_code]['phase'] = 'playing'
-        active_games[game_code]['current_question'] = None
-        
-        # Ensure submitted_answers exists and is empty
-        active_games[game_code]['submitted_answers'] = []
-        
-        # Cancel any lingering timers
-        if 'current_timer' in active_games[game_code] and active_games[game_code]['current_timer']:
-            try:
-                active_games[game_code]['current_timer'].cancel()
-            except:
-                pass
-            active_games[game_code]['current_timer'] = None
-        
-        # Update activity timestamp
-        active_games[game_code]['last_activity'] = datetime.now()
-
-        # Notify all players that feedback has been cleared
-        logging.info(f"Game {game_code}: Clearing feedback state")
-        emit('feedback_cleared', {}, room=game_code)
-        
-        logging.info(f"Game {game_code}: Feedback cleared successfully")
+        if blocking:
+            event_log.write(batch)
+        else:
+            tpool.execute(event_log.write, batch)
     except Exception as e:
-        logging.error(f"Error handling clear_feedback: {str(e)}")
-        # Try to recover if possible
-        try:
-            if 'game_code' in data and data['game_code'] in active_games:
-                emit('feedback_cleared', {}, room=data['game_code'])
-                logging.info(f"Sent recovery feedback clear to game {data['game_code']}")
-        except:
-            logging.error("Failed to send recovery feedback clear message")
-
-# Clean up disconnected games periodically
-def cleanup_inactive_games():
-    """Remove games that have been inactive for more than 2 hours"""
-    current_time = datetime.now()
-    games_to_remove = []
-
-    for game_code, game in active_games.items():
-        # If game has no activity timestamp or is more than 2 hours old
-        if 'last_activity' not in game or (current_time - game['last_activity']).total_seconds() > 7200:
-            games_to_remove.append(game_code)
-
-    for game_code in games_to_remove:
-        del active_games[game_code]
-        logging.info(f"Removed inactive game {game_code}")
-
-# Schedule cleanup every hour
-def schedule_cleanup():
-    cleanup_inactive_games()
-    threading.Timer(3600, schedule_cleanup).start()
+        logging.error(f"Error writing game event log: {str(e)}")
+
+def event_log_loop():
+    while True:
+        socketio.sleep(game.EVENT_LOG_FLUSH_INTERVAL)
+        flush_event_log()
+
+def snapshot_loop():
+    while True:
+        socketio.sleep(game.SNAPSHOT_INTERVAL)
+        save_snapshot()
+
+def stall_heartbeat_loop():
+    while True:
+        profiling.stall_detector.beat()
+        socketio.sleep(profiling.stall_detector.interval)
+
+def create_app():
+    """Build the Flask app and bind SocketIO to it. Has no background side effects."""
+    app = Flask(__name__)
+    app.secret_key = os.environ.get("SESSION_SECRET")
+    CORS(app)
+    app.register_blueprint(bp)
+    assets.init_app(app)
+
+    # Configure SocketIO with eventlet
+    socketio.init_app(
+        app,
+        cors_allowed_origins="*",
+        async_mode='eventlet',
+        logger=True,
+        engineio_logger=True,
+        ping_timeout=60,
+        ping_interval=25,
+        manage_session=False
+    )
+    return app
+
+def flush_on_exit():
+    """Write the final snapshot and buffered events from this process before it exits."""
+    save_snapshot(blocking=True)
+    flush_event_log(blocking=True)
+    logging.info(f"Process {os.getpid()} wrote final game snapshot and event log")
+
+def _shutdown():
+    flush_on_exit()
+    logging.shutdown()
+    os._exit(0)
+
+_shutting_down = False
+
+def _exit_on_sigterm(signum, frame):
+    # The handler interrupts whichever greenlet is running, and engineio would
+    # swallow an exception raised in a socket handler, so flush and exit from
+    # a fresh greenlet on the hub instead of raising here.
+    global _shutting_down
+    if _shutting_down:
+        return
+    _shutting_down = True
+    eventlet.spawn(_shutdown)
 
-# Start cleanup scheduler
-schedule_cleanup()
+_background_services_started = False
 
-# Initialize the OpenAI client
-# the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
-client = OpenAI(api_key=os.environ.get("OPENAI_API_KEY"))
+def start_background_services():
+    """Restore snapshots and start schedulers. Call once per worker, after fork."""
+    global _background_services_started
+    if _background_services_started:
+        return
+    _background_services_started = True
+
+    # Flush from the worker itself: gunicorn exits workers via sys.exit, which
+    # runs atexit. Without gunicorn SIGTERM would kill us outright, so handle
+    # it ourselves, but leave a handler gunicorn already installed alone.
+    atexit.register(flush_on_exit)
+    if signal.getsignal(signal.SIGTERM) == signal.SIG_DFL:
+        signal.signal(signal.SIGTERM, _exit_on_sigterm)
+
+    game.restore_games()
+    schedule_cleanup()
+    socketio.start_background_task(snapshot_loop)
+    socketio.start_background_task(event_log_loop)
+    # Imports and client setup block, so keep them off the hub like asgi.py does
+    socketio.start_background_task(tpool.execute, warm_up)
+    if profiling.stall_detector.enabled:
+        socketio.start_background_task(stall_heartbeat_loop)
+        profiling.stall_detector.start_watchdog()
 
 
 if __name__ == "__main__":
     logging.info("Starting server with WebSocket support...")
     port = int(os.getenv("PORT", 5000))
 
+    app = create_app()
+    start_background_services()
+
     # Simple eventlet configuration
     socketio.run(
         app,
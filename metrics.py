@@ -0,0 +1,115 @@
+"""In-process counters exposed through /api/metrics."""
+import json
+import threading
+
+_lock = threading.Lock()
+_payloads = {}  # (event, audience) -> {'events', 'payload_bytes', 'recipients', 'bytes_sent'}
+
+# USD per million tokens; cached prompt tokens are billed at the cached_input rate
+MODEL_PRICES = {
+    'gpt-4o': {'input': 2.50, 'cached_input': 1.25, 'output': 10.00},
+}
+USAGE_TOP_N = 10
+
+_usage_totals = {}
+_usage_by_kind = {}  # 'generate_question' | 'check_answer' | 'translate' -> counters
+_usage_by_game = {}
+_usage_by_video = {}
+
+
+def payload_size(payload):
+    """Approximate wire size of a Socket.IO payload (its JSON encoding)."""
+    return len(json.dumps(payload, separators=(',', ':'), ensure_ascii=False, default=str).encode('utf-8'))
+
+
+def record_payload(event, audience, size, recipients=1):
+    with _lock:
+        stats = _payloads.setdefault((event, audience), {
+            'events': 0, 'payload_bytes': 0, 'recipients': 0, 'bytes_sent': 0,
+        })
+        stats['events'] += 1
+        stats['payload_bytes'] += size
+        stats['recipients'] += recipients
+        stats['bytes_sent'] += size * recipients
+
+
+def _add_usage(counters, calls, prompt_tokens, cached_tokens, completion_tokens, cost):
+    counters['calls'] = counters.get('calls', 0) + calls
+    counters['prompt_tokens'] = counters.get('prompt_tokens', 0) + prompt_tokens
+    counters['cached_tokens'] = counters.get('cached_tokens', 0) + cached_tokens
+    counters['completion_tokens'] = counters.get('completion_tokens', 0) + completion_tokens
+    counters['cost_usd'] = counters.get('cost_usd', 0.0) + cost
+
+
+def _usage_view(counters):
+    view = dict(counters)
+    view['cost_usd'] = round(counters.get('cost_usd', 0.0), 6)
+    prompt_tokens = counters.get('prompt_tokens', 0)
+    view['cached_ratio'] = round(counters.get('cached_tokens', 0) / prompt_tokens, 3) if prompt_tokens else 0.0
+    return view
+
+
+def estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens):
+    prices = MODEL_PRICES.get(model)
+    if prices is None:
+        return 0.0
+    uncached = prompt_tokens - cached_tokens
+    return (uncached * prices['input'] + cached_tokens * prices['cached_input']
+            + completion_tokens * prices['output']) / 1_000_000
+
+
+def record_usage(kind, model, usage, game_code=None, video_id=None):
+    """Account the token usage of one completion (completion.usage) to its call kind, game and video."""
+    if usage is None:
+        return
+    prompt_tokens = usage.prompt_tokens or 0
+    completion_tokens = usage.completion_tokens or 0
+    details = getattr(usage, 'prompt_tokens_details', None)
+    cached_tokens = (getattr(details, 'cached_tokens', None) or 0) if details else 0
+    cost = estimate_cost(model, prompt_tokens, cached_tokens, completion_tokens)
+
+    with _lock:
+        targets = [_usage_totals, _usage_by_kind.setdefault(kind, {})]
+        if game_code:
+            targets.append(_usage_by_game.setdefault(game_code, {}))
+        if video_id:
+            targets.append(_usage_by_video.setdefault(video_id, {}))
+        for counters in targets:
+            _add_usage(counters, 1, prompt_tokens, cached_tokens, completion_tokens, cost)
+
+
+def game_usage(game_code):
+    with _lock:
+        return _usage_view(_usage_by_game.get(game_code, {}))
+
+
+def forget_game(game_code):
+    with _lock:
+        return _usage_view(_usage_by_game.pop(game_code, {}))
+
+
+def _top_usage(table):
+    ranked = sorted(table.items(), key=lambda item: item[1].get('cost_usd', 0.0), reverse=True)
+    return {key: _usage_view(counters) for key, counters in ranked[:USAGE_TOP_N]}
+
+
+def top_game_usage():
+    """The most expensive games by code. Game codes let anyone join, so keep this off snapshot()."""
+    with _lock:
+        return _top_usage(_usage_by_game)
+
+
+def snapshot():
+    with _lock:
+        payloads = {}
+        for (event, audience), stats in sorted(_payloads.items()):
+            entry = dict(stats)
+            entry['avg_payload_bytes'] = round(stats['payload_bytes'] / stats['events'], 1)
+            payloads.setdefault(event, {})[audience] = entry
+
+        usage = {
+            'totals': _usage_view(_usage_totals),
+            'by_kind': {kind: _usage_view(counters) for kind, counters in sorted(_usage_by_kind.items())},
+            'top_videos': _top_usage(_usage_by_video),
+        }
+    return {'payloads': payloads, 'usage': usage}
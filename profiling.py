@@ -0,0 +1,253 @@
+"""On-demand profiling for the live server, behind the /admin/ routes.
+
+- SamplingProfiler samples every thread's stack from a real OS thread for a
+  few seconds and returns collapsed stacks ("frame;frame;frame count"), the
+  input format of flamegraph.pl and speedscope.
+- CallProfiler runs cProfile around the next N calls of one REST path or
+  socket event and returns pstats text or a .prof dump (snakeviz, flameprof).
+  The loop is shared, so work other greenlets/tasks do while a profiled call
+  waits on I/O is included; only one call is profiled at a time.
+- StallDetector pairs a heartbeat on the event loop with a real-thread
+  watchdog. When the heartbeat is late by more than STALL_THRESHOLD_MS the
+  watchdog captures the loop's stack, and the next heartbeat logs it with
+  how long the loop was blocked.
+
+The surface is disabled unless ADMIN_TOKEN is set; callers authenticate
+with an X-Admin-Token header. The same check guards the per-game usage and
+event export routes.
+"""
+import collections
+import cProfile
+import hmac
+import importlib
+import io
+import logging
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+import traceback
+from datetime import datetime
+
+ADMIN_TOKEN = os.environ.get("ADMIN_TOKEN")
+ADMIN_TOKEN_HEADER = 'X-Admin-Token'
+
+SAMPLE_INTERVAL_MS = 5
+MAX_SAMPLE_SECONDS = 60
+REPORT_LINES = 60
+
+# 0 disables the stall detector
+STALL_THRESHOLD_MS = float(os.environ.get("STALL_THRESHOLD_MS", 250))
+STALL_HISTORY = 50
+
+# Our own threads are left out of samples
+PROFILER_THREAD_NAMES = ('sampling-profiler', 'stall-watchdog')
+
+
+def admin_error(token):
+    """Return (message, status) if the token may not use the admin routes, else None."""
+    if not ADMIN_TOKEN:
+        return "Admin routes are disabled; set ADMIN_TOKEN to enable them", 404
+    if not token or not hmac.compare_digest(token.encode('utf-8'), ADMIN_TOKEN.encode('utf-8')):
+        return "Invalid admin token", 403
+    return None
+
+
+def clamp_seconds(value):
+    return min(max(float(value), 0.1), MAX_SAMPLE_SECONDS)
+
+
+def unpatched(module_name):
+    """The unpatched stdlib module, so profiler threads are real OS threads under eventlet."""
+    patcher = sys.modules.get('eventlet.patcher')
+    if patcher is not None and patcher.is_monkey_patched('thread'):
+        return patcher.original(module_name)
+    return importlib.import_module(module_name)
+
+
+_frame_labels = {}
+
+
+def _frame_label(code):
+    label = _frame_labels.get(code)
+    if label is None:
+        label = f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+        _frame_labels[code] = label
+    return label
+
+
+class SamplingProfiler:
+    """Counts the collapsed stack of every thread, sampled every interval seconds."""
+
+    def __init__(self, interval=SAMPLE_INTERVAL_MS / 1000):
+        self.interval = max(interval, 0.001)
+        self.counts = collections.Counter()
+        self.samples = 0
+        self._stopped = unpatched('threading').Event()
+        self._thread = None
+
+    def start(self):
+        self._thread = unpatched('threading').Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop sampling and return the collapsed stacks, hottest first."""
+        self._stopped.set()
+        self._thread.join()
+        return self.collapsed()
+
+    def _run(self):
+        real_threading = unpatched('threading')
+        sleep = unpatched('time').sleep
+        while not self._stopped.is_set():
+            names = {thread.ident: thread.name for thread in real_threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if names.get(ident) in PROFILER_THREAD_NAMES:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_frame_label(frame.f_code))
+                    frame = frame.f_back
+                stack.append(names.get(ident, f"thread-{ident}"))
+                self.counts[';'.join(reversed(stack))] += 1
+            self.samples += 1
+            sleep(self.interval)
+
+    def collapsed(self):
+        return ''.join(f"{stack} {count}\n" for stack, count in self.counts.most_common())
+
+
+class CallProfiler:
+    """cProfile for the next N calls of armed targets (a REST path or a socket event name)."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._targets = {}  # target -> {'remaining', 'calls', 'stats'}
+        self._active = False
+
+    def arm(self, target, count=1):
+        with self._lock:
+            self._targets[target] = {'remaining': count, 'calls': 0, 'stats': None}
+
+    def disarm(self, target):
+        with self._lock:
+            return self._targets.pop(target, None) is not None
+
+    def status(self, target):
+        with self._lock:
+            session = self._targets.get(target)
+            if session is None:
+                return None
+            return {'target': target, 'remaining': session['remaining'], 'calls': session['calls']}
+
+    def start(self, target):
+        """Begin profiling one call of target if it is armed; returns the profile or None."""
+        if target not in self._targets or self._active:
+            return None
+        with self._lock:
+            session = self._targets.get(target)
+            if session is None or session['remaining'] <= 0 or self._active:
+                return None
+            session['remaining'] -= 1
+            self._active = True
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def finish(self, target, profile):
+        profile.disable()
+        with self._lock:
+            self._active = False
+            session = self._targets.get(target)
+            if session is None:
+                return
+            session['calls'] += 1
+            if session['stats'] is None:
+                session['stats'] = pstats.Stats(profile)
+            else:
+                session['stats'].add(profile)
+
+    def call(self, target, fn, *args):
+        profile = self.start(target)
+        if profile is None:
+            return fn(*args)
+        try:
+            return fn(*args)
+        finally:
+            self.finish(target, profile)
+
+    def report(self, target, fmt='text'):
+        """pstats text sorted by cumulative time, or the marshalled .prof bytes; None if nothing recorded."""
+        with self._lock:
+            session = self._targets.get(target)
+            stats = session and session['stats']
+            if stats is None:
+                return None
+            if fmt == 'prof':
+                return marshal.dumps(stats.stats)
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats('cumulative').print_stats(REPORT_LINES)
+            return stream.getvalue()
+
+
+class StallDetector:
+    """Detects handlers that block the event loop for longer than threshold seconds."""
+
+    def __init__(self, threshold):
+        self.threshold = threshold
+        self.interval = threshold / 4
+        self.stalls = collections.deque(maxlen=STALL_HISTORY)
+        self._last_beat = None
+        self._loop_ident = None
+        self._pending = None
+        self._thread = None
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def beat(self):
+        """Called from the event loop every interval seconds."""
+        now = time.monotonic()
+        if self._loop_ident is None:
+            self._loop_ident = unpatched('threading').get_ident()
+
+        # Log from the loop side: the watchdog thread only captures the stack
+        stall, self._pending = self._pending, None
+        if stall is not None:
+            stall['blocked_ms'] = round(max(now - self._last_beat - self.interval, 0) * 1000)
+            self.stalls.append(stall)
+            logging.warning(f"Event loop was blocked for {stall['blocked_ms']} ms; "
+                            f"loop stack when detected:\n{stall['stack']}")
+        self._last_beat = now
+
+    def start_watchdog(self):
+        if not self.enabled or self._thread is not None:
+            return
+        self._thread = unpatched('threading').Thread(target=self._watch, name='stall-watchdog', daemon=True)
+        self._thread.start()
+
+    def _watch(self):
+        sleep = unpatched('time').sleep
+        while True:
+            sleep(self.interval)
+            last_beat = self._last_beat
+            if last_beat is None or self._pending is not None:
+                continue
+            if time.monotonic() - last_beat > self.threshold:
+                frame = sys._current_frames().get(self._loop_ident)
+                self._pending = {
+                    'detected_at': datetime.now().isoformat(timespec='milliseconds'),
+                    'stack': ''.join(traceback.format_stack(frame)) if frame is not None else '',
+                }
+
+    def snapshot(self):
+        return {'threshold_ms': self.threshold * 1000, 'stalls': list(self.stalls)}
+
+
+call_profiler = CallProfiler()
+stall_detector = StallDetector(STALL_THRESHOLD_MS / 1000)
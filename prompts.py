@@ -0,0 +1,93 @@
+"""Prompt assembly for the OpenAI calls.
+
+Every call starts with a static prefix (function schema, then the system
+instructions) that is byte-identical across calls. Anything that varies
+(grade level, question style, transcript text, the student's answer,
+the target language) comes after it, so provider-side prompt caching can
+reuse the prefix.
+"""
+from functools import lru_cache
+
+MODEL = "gpt-4o"
+FUNCTION_NAME = "generate_reflection_prompt"
+
+QUESTION_SYSTEM_PROMPT = (
+    "You are an expert in creating multiple-choice questions. "
+    "You will be given the target grade level, the question style and a transcript excerpt from an "
+    "educational video. Write one question about the excerpt with exactly one correct answer and "
+    "plausible incorrect answers, worded for the given grade level and in the given style."
+)
+
+CHECK_ANSWER_SYSTEM_PROMPT = (
+    "You are an expert in validating student answers. "
+    "You will be given the context, the question and a student's answer. Please check if the answer "
+    "is somewhat correct. Be lenient - even close or short answers are fine. "
+    "If incorrect, please explain why."
+)
+
+TRANSLATE_SYSTEM_PROMPT = (
+    "You are a professional translator. Keep any special formatting and HTML intact. "
+    "Only translate the actual text content."
+)
+
+QUESTION_STYLE_PROMPTS = {
+    1: "Create very specific, factual multiple-choice questions that directly test recall of information presented in the content. Focus on names, dates, and explicit facts mentioned.",
+    2: "Create factual multiple-choice questions that test basic comprehension of the main points in the content.",
+    3: "Create balanced multiple-choice questions that test both recall of facts and understanding of concepts from the content.",
+    4: "Create analytical multiple-choice questions that require deeper understanding and application of concepts from the content.",
+    5: "Create deep thinking multiple-choice questions that challenge students to evaluate, synthesize or apply the content in new contexts. These should require critical thinking beyond just recalling information.",
+}
+
+
+@lru_cache(maxsize=None)
+def _function(schema_name):
+    import schemas
+
+    # Built once so the schema JSON (part of the cached prefix) never changes between calls
+    return [{
+        "name": FUNCTION_NAME,
+        "parameters": getattr(schemas, schema_name).model_json_schema(),
+    }]
+
+
+def question_functions():
+    return _function("ReflectionClosedPromptResponse")
+
+
+def check_answer_functions():
+    return _function("RefectionSinglePromptResponse")
+
+
+def grade_prompt(grade_level):
+    if grade_level == "1":
+        return "Create questions suitable for 1st grade students."
+    return f"Create questions suitable for {grade_level}th grade students."
+
+
+def question_messages(grade_level, question_type, content_segment):
+    # Create a question type prompt based on the slider value (1-5)
+    question_style_prompt = QUESTION_STYLE_PROMPTS.get(question_type, QUESTION_STYLE_PROMPTS[5])
+    return [
+        {"role": "system", "content": QUESTION_SYSTEM_PROMPT},
+        {
+            "role": "user",
+            "content": f"{grade_prompt(grade_level)} {question_style_prompt}\n"
+                       f"Generate a multiple-choice question based on this content: {content_segment}"
+        },
+    ]
+
+
+def check_answer_messages(content_segment, question, answer):
+    # Context and question are shared by every answer in a round; the answer goes last
+    return [
+        {"role": "system", "content": CHECK_ANSWER_SYSTEM_PROMPT},
+        {"role": "user", "content": f"Context: {content_segment}\nQuestion: {question}\nAnswer: {answer}"},
+    ]
+
+
+def translate_messages(text, target_language):
+    return [
+        {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT},
+        {"role": "system", "content": f"Translate the following text to {target_language}."},
+        {"role": "user", "content": text},
+    ]
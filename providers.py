@@ -0,0 +1,85 @@
+import importlib
+import logging
+import os
+import time
+
+from profiling import unpatched
+
+# Heavy modules imported by warm_up() so the first request doesn't pay for them
+WARM_UP_MODULES = ('requests', 'qrcode', 'schemas')
+
+# Timeout for outbound HTTP calls made by the asyncio server
+HTTP_TIMEOUT = float(os.environ.get("HTTP_TIMEOUT", 30))
+
+_openai_client = None
+# warm_up() may hold this on a tpool thread; a green lock would never wake the hub's waiters
+_openai_lock = unpatched('threading').Lock()
+
+# Async clients are bound to the event loop that first uses them (asgi.py's)
+_async_openai_client = None
+_async_http_client = None
+
+
+def _openai_api_key():
+    openai_api_key = os.environ.get("OPENAI_API_KEY")
+    if not openai_api_key:
+        logging.warning("OPENAI_API_KEY not found in environment variables")
+    return openai_api_key
+
+
+def get_openai_client():
+    """Return the shared OpenAI client, importing and constructing it on first use."""
+    global _openai_client
+    if _openai_client is None:
+        with _openai_lock:
+            if _openai_client is None:
+                from openai import OpenAI
+
+                # the newest OpenAI model is "gpt-4o" which was released May 13, 2024.
+                _openai_client = OpenAI(api_key=_openai_api_key())
+    return _openai_client
+
+
+def get_async_openai_client():
+    """Return the shared AsyncOpenAI client. Only called from the event loop, so no lock."""
+    global _async_openai_client
+    if _async_openai_client is None:
+        from openai import AsyncOpenAI
+
+        _async_openai_client = AsyncOpenAI(api_key=_openai_api_key())
+    return _async_openai_client
+
+
+def get_async_http_client():
+    """Return the shared httpx.AsyncClient used for non-OpenAI HTTP calls."""
+    global _async_http_client
+    if _async_http_client is None:
+        import httpx
+
+        _async_http_client = httpx.AsyncClient(timeout=HTTP_TIMEOUT)
+    return _async_http_client
+
+
+async def close_async_clients():
+    global _async_openai_client, _async_http_client
+    if _async_openai_client is not None:
+        await _async_openai_client.close()
+        _async_openai_client = None
+    if _async_http_client is not None:
+        await _async_http_client.aclose()
+        _async_http_client = None
+
+
+def warm_up():
+    """Import heavy dependencies and build provider clients in the background."""
+    start = time.perf_counter()
+    for module_name in WARM_UP_MODULES:
+        try:
+            importlib.import_module(module_name)
+        except ImportError as e:
+            logging.warning(f"Warm-up could not import {module_name}: {str(e)}")
+    try:
+        get_openai_client()
+    except Exception as e:
+        logging.warning(f"Warm-up could not create OpenAI client: {str(e)}")
+    logging.info(f"Provider warm-up finished in {(time.perf_counter() - start) * 1000:.0f} ms")
@@ -0,0 +1,26 @@
+import base64
+from io import BytesIO
+
+
+def qr_code_data_uri(data):
+    """Render data as a QR code and return it as a PNG data: URI."""
+    import qrcode
+
+    # Create QR code
+    qr = qrcode.QRCode(
+        version=1,
+        error_correction=qrcode.constants.ERROR_CORRECT_H,
+        box_size=10,
+        border=4,
+    )
+    qr.add_data(data)
+    qr.make(fit=True)
+
+    # Create an image from the QR Code
+    img = qr.make_image(fill_color="black", back_color="white")
+
+    # Convert image to bytes
+    buffered = BytesIO()
+    img.save(buffered, format="PNG")
+    img_str = base64.b64encode(buffered.getvalue()).decode()
+    return f"data:image/png;base64,{img_str}"
@@ -0,0 +1,19 @@
+from typing import List
+
+from pydantic import BaseModel
+
+
+class ReflectionClosedQuestion(BaseModel):
+    question: str
+    correct_answer: str
+    incorrect_answers: List[str]
+
+class ReflectionClosedPromptResponse(BaseModel):
+    reflection_prompt: ReflectionClosedQuestion
+
+class ReflectionSingleQuestion(BaseModel):
+    is_correct: bool
+    explanation: str
+
+class RefectionSinglePromptResponse(BaseModel):
+    reflection_prompt: ReflectionSingleQuestion
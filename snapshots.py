@@ -0,0 +1,189 @@
+import json
+import logging
+import os
+import struct
+import zlib
+from datetime import datetime
+
+from profiling import unpatched
+
+# File layout: header (magic, record count) followed by one record per game:
+# code length, code, blob length, zlib-compressed JSON blob.
+SNAPSHOT_MAGIC = b'ACS1'
+_HEADER = struct.Struct('>4sI')
+_CODE_LEN = struct.Struct('>B')
+_BLOB_LEN = struct.Struct('>I')
+
+# Game fields worth surviving a restart. Sockets and timers are process-local
+# and are rebuilt when clients reconnect through join_game_room.
+SNAPSHOT_FIELDS = (
+    'video_id',
+    'host_id',
+    'players',
+    'current_question',
+    'phase',
+    'feedback_shown',
+    'submitted_answers',
+    'settings',
+    'feedback_data',
+    'question_index',
+)
+DATETIME_FIELDS = ('last_activity', 'timer_end')
+
+
+def _copy_json(value):
+    if isinstance(value, dict):
+        return {key: _copy_json(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_copy_json(item) for item in value]
+    return value
+
+
+def snapshot_state(game):
+    """Copy the persistent part of a game, detached from the live dicts.
+
+    Cheap enough to run on the event loop; the copy can then be encoded on
+    another thread while handlers keep mutating the game.
+    """
+    state = {key: _copy_json(game[key]) for key in SNAPSHOT_FIELDS if key in game}
+    for key in DATETIME_FIELDS:
+        if game.get(key) is not None:
+            state[key] = game[key].isoformat()
+    return state
+
+
+def encode_state(state):
+    raw = json.dumps(state, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+    return zlib.compress(raw, 6)
+
+
+def encode_game(game):
+    """Serialize the persistent part of a game into a compressed blob."""
+    return encode_state(snapshot_state(game))
+
+
+def decode_game(blob):
+    """Inverse of encode_game: rebuild a game dict from a compressed blob."""
+    state = json.loads(zlib.decompress(blob).decode('utf-8'))
+    for key in DATETIME_FIELDS:
+        if state.get(key):
+            state[key] = datetime.fromisoformat(state[key])
+    return state
+
+
+class SnapshotStore:
+    """Incremental snapshot writer for the active_games table.
+
+    Only games marked dirty since the previous snapshot are re-encoded; the
+    compressed blobs of untouched games are reused as-is. mark_dirty() and
+    collect() run on the event loop and own _dirty and _known; save() encodes
+    and writes on a worker thread and owns _blobs, so the two sides never
+    wait on each other.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self._dirty = set()
+        self._known = set()  # games in the last collected batch
+        self._blobs = {}
+        # A real OS lock: under eventlet a green lock held by a tpool thread never wakes the hub
+        self._build_lock = unpatched('threading').Lock()
+
+    def mark_dirty(self, game_code):
+        self._dirty.add(game_code)
+
+    def collect(self, games):
+        """Copy the state of changed games, to be encoded later by build().
+
+        This is the only step that touches the live games, so it is the one
+        that runs on the event loop. Returns None when nothing changed since
+        the last call, so callers can skip encoding and the disk write.
+        """
+        dirty, self._dirty = self._dirty, set()
+
+        removed = [code for code in self._known if code not in games]
+        states = {}
+        # Games that were never marked (e.g. restored ones) still belong in the file
+        for code, game in games.items():
+            if code in dirty or code not in self._known:
+                states[code] = snapshot_state(game)
+
+        if not removed and not states:
+            return None
+        self._known.difference_update(removed)
+        self._known.update(states)
+        return removed, states
+
+    def build(self, batch):
+        """Encode a collected batch and return the full snapshot bytes. Safe off the loop."""
+        removed, states = batch
+        with self._build_lock:
+            for code in removed:
+                self._blobs.pop(code, None)
+            for code, state in states.items():
+                try:
+                    self._blobs[code] = encode_state(state)
+                except (TypeError, ValueError) as e:
+                    logging.error(f"Could not snapshot game {code}: {str(e)}")
+
+            parts = [_HEADER.pack(SNAPSHOT_MAGIC, len(self._blobs))]
+            for code, blob in self._blobs.items():
+                code_bytes = code.encode('utf-8')
+                parts.append(_CODE_LEN.pack(len(code_bytes)))
+                parts.append(code_bytes)
+                parts.append(_BLOB_LEN.pack(len(blob)))
+                parts.append(blob)
+        return b''.join(parts)
+
+    def save(self, batch):
+        """build() and write() a collected batch; meant for a worker thread."""
+        self.write(self.build(batch))
+
+    def write(self, data):
+        """Atomically replace the snapshot file with data."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def load(self):
+        """Read the snapshot file and return {game_code: game_state}."""
+        try:
+            with open(self.path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return {}
+
+        if len(data) < _HEADER.size:
+            logging.warning(f"Snapshot file {self.path} is truncated, ignoring it")
+            return {}
+
+        magic, count = _HEADER.unpack_from(data, 0)
+        if magic != SNAPSHOT_MAGIC:
+            logging.warning(f"Snapshot file {self.path} has an unknown format, ignoring it")
+            return {}
+
+        games = {}
+        offset = _HEADER.size
+        try:
+            for _ in range(count):
+                (code_len,) = _CODE_LEN.unpack_from(data, offset)
+                offset += _CODE_LEN.size
+                code = data[offset:offset + code_len].decode('utf-8')
+                offset += code_len
+                (blob_len,) = _BLOB_LEN.unpack_from(data, offset)
+                offset += _BLOB_LEN.size
+                blob = data[offset:offset + blob_len]
+                offset += blob_len
+                games[code] = decode_game(blob)
+                self._blobs[code] = blob
+                self._known.add(code)
+        except (struct.error, zlib.error, ValueError) as e:
+            logging.error(f"Snapshot file {self.path} is corrupt after {len(games)} games: {str(e)}")
+
+        return games
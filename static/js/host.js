@@ -19,6 +19,7 @@ class HostGame {
         this.questionInterval = 2; // Default: generate questions every 2 minutes
         this.questionType = 3; // Default: balanced question type (1-5 scale)
         this.feedbackAttempts = 0; // Track feedback attempts for retry logic
+        this.leaderboardTop = null; // Full ranking from the server's leaderboard_update
         this.reconnecting = false;
         
         // Try to load previous game data from session storage
@@ -177,7 +178,8 @@ class HostGame {
                 },
                 body: JSON.stringify({
                     text: text,
-                    target_language: 'hebrew'
+                    target_language: 'hebrew',
+                    game_code: this.gameCode // Lets the server attribute token usage to this game
                 }),
             });
 
@@ -327,6 +329,11 @@ class HostGame {
             this.handlePlayerAnswer(data.player_id, data.nickname, data.answer);
         });
 
+        this.socket.on('leaderboard_update', (data) => {
+            this.leaderboardTop = data.top;
+            this.updateScoreDisplay();
+        });
+
         this.socket.on('show_feedback', (data) => {
             console.log('Received show_feedback event:', data);
             
@@ -507,9 +514,14 @@ class HostGame {
     }
 
     updateScoreDisplay() {
-        const scoresList = Array.from(this.players.entries())
-            .sort((a, b) => b[1].score - a[1].score)
-            .map(([id, player]) => `${player.nickname}: ${player.score}`);
+        // The server sends the host every player ranked; anyone who joined since the last round is still on 0
+        const ranked = this.leaderboardTop || [];
+        const rankedIds = new Set(ranked.map(entry => entry.player_id));
+        const scoresList = ranked
+            .map(entry => `${entry.rank}. ${entry.nickname}: ${entry.score}`)
+            .concat(Array.from(this.players.entries())
+                .filter(([id]) => !rankedIds.has(id))
+                .map(([id, player]) => `${player.nickname}: ${player.score}`));
 
         this.playerScores.innerHTML = scoresList
             .map(score => `<div class="badge bg-secondary me-2">${score}</div>`)
@@ -678,7 +690,8 @@ class HostGame {
                     start_time: startTime,
                     end_time: endTime,
                     question_type: this.questionType, // Send the question type (1-5)
-                    difficulty: this.gradeLevel.value
+                    difficulty: this.gradeLevel.value,
+                    game_code: this.gameCode
                 }),
             });
 
@@ -873,6 +886,7 @@ class HostGame {
 
             // Create a structured request with all player answers
             const requestData = {
+                game_code: this.gameCode,
                 content_segment: this.currentQuestion.content_segment,
                 question: this.currentQuestion.reflective_question,
                 answers: Array.from(this.playerAnswers.entries()).map(([pid, ans]) => ({
@@ -983,6 +997,9 @@ class HostGame {
             this.explanationArea.classList.remove('hidden');
         }
 
+        // Ask the server to broadcast the updated leaderboard and each player's rank
+        this.socket.emit('grading_complete', { game_code: this.gameCode });
+
         // Update scores and show continue button
         this.updateScoreDisplay();
         this.continueVideo.classList.remove('hidden');
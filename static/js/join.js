@@ -29,6 +29,9 @@ class PlayerGame {
         this.finalScore = document.getElementById('finalScore');
         this.playAgainBtn = document.getElementById('playAgain');
         this.playerScore = document.getElementById('playerScore');
+        this.playerRankLine = document.getElementById('playerRankLine');
+        this.playerRank = document.getElementById('playerRank');
+        this.rankTotal = document.getElementById('rankTotal');
         this.languageToggle = document.getElementById('languageToggle');
 
         // Check for game code in URL
@@ -176,7 +179,8 @@ class PlayerGame {
                 },
                 body: JSON.stringify({
                     text: text,
-                    target_language: 'hebrew'
+                    target_language: 'hebrew',
+                    game_code: this.gameCode // Lets the server attribute token usage to this game
                 }),
             });
 
@@ -344,12 +348,8 @@ class PlayerGame {
             this.answerArea.innerHTML = '';
             this.feedback.classList.add('hidden');
 
-            const answers = [
-                questionData.correct_answer,
-                ...questionData.incorrect_answers
-            ].sort(() => Math.random() - 0.5);
-
-            for (const answer of answers) {
+            // Options arrive already shuffled; the correct answer is never sent to players
+            for (const answer of questionData.options) {
                 const option = document.createElement('div');
                 option.className = 'answer-option';
                 option.setAttribute('data-original-text', answer);
@@ -376,6 +376,12 @@ class PlayerGame {
             }
         });
 
+        // The server sends our own rank after each graded round
+        this.socket.on('rank_update', (data) => {
+            console.log('Rank update received:', data);
+            this.showRank(data.rank, data.total_players, data.score);
+        });
+
         // Add new event handler for rejected answers
         this.socket.on('answer_rejected', async (data) => {
             console.log('Answer rejected:', data);
@@ -569,6 +575,19 @@ class PlayerGame {
         }
     }
 
+    showRank(rank, totalPlayers, score) {
+        this.score = score;
+        this.saveStateToStorage();
+        if (this.playerScore) {
+            this.playerScore.textContent = this.score;
+        }
+        if (this.playerRankLine && rank) {
+            this.playerRank.textContent = rank;
+            this.rankTotal.textContent = totalPlayers;
+            this.playerRankLine.classList.remove('hidden');
+        }
+    }
+
     async submitAnswer(answer) {
         if (!this.currentQuestion || this.hasAnswered) return;
 
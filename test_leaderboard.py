@@ -0,0 +1,56 @@
+import random
+
+import pytest
+
+from leaderboard import Leaderboard
+
+
+def brute_force_order(scores):
+    return sorted(scores, key=lambda player_id: (-scores[player_id], int(player_id)))
+
+
+def brute_force_rank(scores, player_id):
+    return 1 + sum(1 for score in scores.values() if score > scores[player_id])
+
+
+@pytest.mark.parametrize('seed', range(20))
+def test_matches_brute_force_sort(seed):
+    rng = random.Random(seed)
+    leaderboard, scores = Leaderboard(), {}
+    next_id = 0
+
+    for _ in range(500):
+        action = rng.random()
+        if action < 0.3 or not scores:
+            player_id = str(next_id)
+            next_id += 1
+            scores[player_id] = 0
+            leaderboard.set_score(player_id, 0)
+        elif action < 0.85:
+            # Few distinct scores so ties are common
+            player_id = rng.choice(list(scores))
+            scores[player_id] = rng.randrange(0, 600, 100)
+            leaderboard.set_score(player_id, scores[player_id])
+        else:
+            player_id = rng.choice(list(scores))
+            del scores[player_id]
+            leaderboard.remove(player_id)
+
+        assert len(leaderboard) == len(scores)
+        k = rng.randint(0, len(scores) + 2)
+        assert leaderboard.top(k) == [(p, scores[p]) for p in brute_force_order(scores)[:k]]
+
+    for player_id in scores:
+        assert leaderboard.score(player_id) == scores[player_id]
+        assert leaderboard.rank(player_id) == brute_force_rank(scores, player_id)
+
+
+def test_from_players_and_unknown_player():
+    players = {'1': {'score': 200}, '2': {'score': 300}, '3': {}}
+    leaderboard = Leaderboard.from_players(players)
+
+    assert leaderboard.top(3) == [('2', 300), ('1', 200), ('3', 0)]
+    assert leaderboard.rank('3') == 3
+    assert leaderboard.rank('missing') is None
+    assert leaderboard.score('missing') == 0
+    assert 'missing' not in leaderboard
@@ -0,0 +1,48 @@
+"""Per-audience projections of game events.
+
+Every socket in a game also joins one audience room (host, player or
+spectator), and each event is projected to the fields that audience needs.
+Students never receive the correct answer, the transcript segment, or
+other students' answers.
+"""
+import random
+
+HOST = 'host'
+PLAYER = 'player'
+SPECTATOR = 'spectator'
+AUDIENCES = (HOST, PLAYER, SPECTATOR)
+
+
+def audience_room(game_code, audience):
+    return f"{game_code}:{audience}"
+
+
+def shuffled_options(question):
+    """Answer options in one random order shared by every student."""
+    answers = [question.get('correct_answer'), *question.get('incorrect_answers', [])]
+    options = [answer for answer in answers if answer is not None]
+    random.shuffle(options)
+    return options
+
+
+def question_view(question, audience, timer_duration=None):
+    """Project a stored question ({text, correct_answer, incorrect_answers, content_segment, options})."""
+    if question is None:
+        return None
+    if audience == HOST:
+        view = dict(question)
+    else:
+        view = {
+            'text': question.get('text'),
+            'options': question.get('options') or shuffled_options(question),
+        }
+    if timer_duration is not None and audience != SPECTATOR:
+        view['timer_duration'] = timer_duration
+    return view
+
+
+def feedback_view(submitted_answers, audience):
+    """Host gets every answer to grade; everyone else only learns how many came in."""
+    if audience == HOST:
+        return {'answers': submitted_answers}
+    return {'answer_count': len(submitted_answers)}